@@ -1,13 +1,39 @@
+from __future__ import annotations
 import subprocess
-from re import U
-from unicodedata import name
-import clang.cindex
-from clang.cindex import CursorKind, TypeKind
+import re
 import argparse
 import pathlib
 import os
+import sys
+import time
+import json
+import queue
+import threading
+import shutil
+import tempfile
+import io
+import contextlib
+import traceback
+import linecache
+try:
+    import resource
+except ImportError:
+    resource = None
+import hashlib
+import collections
 from typing import Iterable
 
+# libclang is only loaded by the commands parsing C++ sources, see `load_clang()`.
+# Likewise sqlite3, tarfile, ctypes, zlib, concurrent.futures and importlib.metadata are imported by the commands using them,
+# so commands such as `rtransform`, run by git for each rebase, do not pay for them at startup.
+clang = None
+CursorKind = None
+TypeKind = None
+StorageClass = None
+
+# Maximum time in seconds for commands not using libclang (e.g. `rtransform`) to start and complete, checked by test/test_make_explicit_imgui.py
+STARTUP_BUDGET = 0.5
+
 BLACKLIST = set([
     'CreateContext',
     'DestroyContext',
@@ -20,6 +46,43 @@ BLACKLIST = set([
     'CreateTextFilter'
 ])
 
+# Preprocessor configurations parsed by `convert --matrix`, in addition to the default one.
+# Each one reveals code the default configuration does not compile, e.g. the stubs of
+# IMGUI_DISABLE_DEMO_WINDOWS or the test engine hooks.
+DEFINE_MATRIX = {
+    'default': [],
+    'no-obsolete': ['IMGUI_DISABLE_OBSOLETE_FUNCTIONS'],
+    'no-obsolete-keyio': ['IMGUI_DISABLE_OBSOLETE_KEYIO'],
+    'no-debug-tools': ['IMGUI_DISABLE_DEBUG_TOOLS', 'IMGUI_DISABLE_METRICS_WINDOW', 'IMGUI_DISABLE_DEMO_WINDOWS'],
+    'no-default-functions': ['IMGUI_DISABLE_DEFAULT_FILE_FUNCTIONS', 'IMGUI_DISABLE_DEFAULT_FORMAT_FUNCTIONS', 'IMGUI_DISABLE_DEFAULT_ALLOCATORS', 'IMGUI_DISABLE_TTY_FUNCTIONS'],
+    'test-engine': ['IMGUI_ENABLE_TEST_ENGINE'],
+}
+
+# Options of the `convert` runs made by `regress` on each snapshot of test/snapshots, the golden results are in test/golden.json
+REGRESSION_CASES = {
+    'default': [],
+    'implicit-api': ['--implicit-api'],
+    'thread-safe': ['--thread-safe'],
+    'matrix': ['--matrix', 'all'],
+}
+
+# Seconds added to the time budget of each phase recorded by `regress --update`
+REGRESSION_TIME_SLACK = 0.5
+
+# Number of generated functions parsed by the workload measuring the speed of the host, see measure_host_baseline()
+HOST_BASELINE_FUNCTIONS = 2000
+
+# Megabytes added to the memory growth budget of each phase recorded by `regress --update`,
+# most phases do not raise the peak memory of the process at all
+REGRESSION_MEMORY_SLACK = 8.0
+
+# With --thread-safe, those functions keep using the current context of the calling thread
+# instead of receiving an explicit context, so IM_ALLOC/IM_FREE do not need one.
+THREAD_LOCAL_CONTEXT_FUNC = set([
+    'MemAlloc',
+    'MemFree',
+])
+
 CLASS_WITH_CONTEXT = set([
     'ImGuiIO',
     'ImGuiWindow',
@@ -29,6 +92,24 @@ CLASS_WITH_CONTEXT = set([
     'ImGuiInputTextState',
 ])
 
+# Canonical parameter types a literal `0` converts to with the same rank as to `ImGuiContext*`,
+# which makes calls such as `SameLine(0)` ambiguous between the implicit and the explicit API, see generate_implicit_api()
+LITERAL_AMBIGUOUS_TYPES = set([
+    'bool',
+    'char',
+    'signed char',
+    'unsigned char',
+    'short',
+    'unsigned short',
+    'unsigned int',
+    'long',
+    'unsigned long',
+    'long long',
+    'unsigned long long',
+    'float',
+    'double',
+])
+
 SPECIAL_TEMPLATE_FUNC = set([
     'ScaleRatioFromValueT',
     'ScaleValueFromRatioT',
@@ -38,6 +119,115 @@ SPECIAL_TEMPLATE_FUNC = set([
     'CheckboxFlagsT',
 ])
 
+def load_clang():
+    """
+        Import the libclang python bindings on first use
+    """
+    global clang, CursorKind, TypeKind, StorageClass
+    if clang is None:
+        import clang.cindex
+        from clang.cindex import CursorKind, TypeKind, StorageClass
+
+class FFIProfiler:
+    """
+        Count and time the calls made to libclang per call site of this script, for `convert --profile-ffi`.
+        Every function of `clang.cindex.conf.lib` is wrapped: the time of a call excludes the nested libclang calls
+        made by the bindings, and the call site is the innermost frame of this script.
+        A call is a redundant repeat when the same function was already called with the same first argument, e.g. the same cursor,
+        during the same phase of the conversion. The calls seen are forgotten by `end_phase`, so their number is bounded by one phase.
+        The wrappers add their own overhead, so absolute timings are pessimistic but the ranking of call sites holds.
+    """
+    def __init__(self):
+        import ctypes
+        self._ctypes = ctypes
+        # (libclang function, script function, line) -> [calls, exclusive time, repeats]
+        self.stats : dict[tuple[str, str, int], list] = dict()
+        self._seen : set[int] = set()
+        self._stack : list[float] = []
+        self._filename = __file__
+        self._profiler_code = set([FFIProfiler._record.__code__, self._wrap(None, None).__code__])
+
+    def install(self):
+        lib = clang.cindex.conf.lib
+        for item in clang.cindex.functionList:
+            function = getattr(lib, item[0], None)
+            if function is not None:
+                # Wrappers inherited from a forked parent process are replaced
+                setattr(lib, item[0], self._wrap(item[0], getattr(function, '__wrapped__', function)))
+
+    def _wrap(self, name: str, function):
+        def wrapper(*args):
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = self._stack.pop()
+                if len(self._stack) > 0:
+                    self._stack[-1] += elapsed
+                self._record(name, elapsed - nested, args)
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def _record(self, name: str, elapsed: float, args):
+        # Nested calls made by the bindings are attributed to the frame of this script calling the outer one
+        frame = sys._getframe(1)
+        while frame is not None and (frame.f_code.co_filename != self._filename or frame.f_code in self._profiler_code):
+            frame = frame.f_back
+        site = (name, getattr(frame.f_code, 'co_qualname', frame.f_code.co_name), frame.f_lineno) if frame is not None else (name, '<bindings>', 0)
+
+        stat = self.stats.get(site)
+        if stat is None:
+            stat = [0, 0.0, 0]
+            self.stats[site] = stat
+        stat[0] += 1
+        stat[1] += elapsed
+
+        ctypes = self._ctypes
+        if len(args) > 0 and isinstance(args[0], ctypes.Structure):
+            key = hash((name, ctypes.string_at(ctypes.addressof(args[0]), ctypes.sizeof(args[0]))))
+            if key in self._seen:
+                stat[2] += 1
+            else:
+                self._seen.add(key)
+
+    def end_phase(self):
+        self._seen.clear()
+
+    def merge(self, stats: dict[tuple[str, str, int], list]):
+        for site, (calls, elapsed, repeats) in stats.items():
+            stat = self.stats.setdefault(site, [0, 0.0, 0])
+            stat[0] += calls
+            stat[1] += elapsed
+            stat[2] += repeats
+
+    def report(self, count=25):
+        def print_table(title, rows):
+            print(title)
+            print('{:>10} {:>10} {:>10} {:>10}  {}'.format('time (ms)', 'calls', 'repeats', 'us/call', 'call site'))
+            rows = sorted(rows, key=lambda r: r[1][1], reverse=True)
+            for label, (calls, elapsed, repeats) in rows[:count]:
+                print('{:>10.1f} {:>10} {:>10} {:>10.2f}  {}'.format(elapsed * 1000, calls, repeats, elapsed * 1e6 / calls, label))
+
+        def group(key):
+            groups : dict[str, list] = dict()
+            for site, (calls, elapsed, repeats) in self.stats.items():
+                stat = groups.setdefault(key(site), [0, 0.0, 0])
+                stat[0] += calls
+                stat[1] += elapsed
+                stat[2] += repeats
+            return groups.items()
+
+        total_calls = sum(s[0] for s in self.stats.values())
+        total_time = sum(s[1] for s in self.stats.values())
+        total_repeats = sum(s[2] for s in self.stats.values())
+        print('# libclang FFI profile #')
+        print('{} calls, {:.3f}s in libclang, {} redundant repeats'.format(total_calls, total_time, total_repeats))
+        print_table('## Heaviest call sites ##', [('{} <- {}:{}'.format(*site), stat) for site, stat in self.stats.items()])
+        print_table('## Per libclang function ##', group(lambda site: site[0]))
+        print_table('## Per script function ##', group(lambda site: site[1]))
+
 class CodeRange:
     def __init__(self, file, start_line, start_column, end_line, end_column):
         if isinstance(file, str):
@@ -60,7 +250,7 @@ class CodeRange:
         return hash(self.__key())
 
     def __eq__(self, other):
-        if isinstance(other, FunctionEntry):
+        if isinstance(other, CodeRange):
             return self.__key() == other.__key()
         return NotImplemented
     def __str__(self):
@@ -84,10 +274,112 @@ class CodeRange:
 
         return CodeRange(file, source_location.line, source_location.column, source_location.line, source_location.column + offset)
 
+class CursorIdentity:
+    """
+        Identity of a cursor as seen by the analysis: id, fully qualified name, file and validity.
+        Each attribute is only resolved through libclang the first time it is requested.
+    """
+    def __init__(self, cache, cursor: clang.cindex.Cursor):
+        self._cache = cache
+        self._cursor = cursor
+        self._file : pathlib.Path = None
+        self._usr : str = None
+        self._mangled_name : str = None
+        self._id : str = None
+        self._id_resolved = False
+        self._fq_name : str = None
+        self._is_valid : bool = None
+
+    @property
+    def file(self) -> pathlib.Path:
+        if self._file is None:
+            self._file = pathlib.Path(str(self._cursor.location.file))
+        return self._file
+
+    @property
+    def usr(self) -> str:
+        if self._usr is None:
+            self._usr = self._cursor.get_usr()
+        return self._usr
+
+    @property
+    def mangled_name(self) -> str:
+        if self._mangled_name is None:
+            self._mangled_name = self._cursor.mangled_name
+        return self._mangled_name
+
+    @property
+    def fq_name(self) -> str:
+        if self._fq_name is None:
+            parent = self._cursor.semantic_parent
+            if parent is None or parent.kind == CursorKind.TRANSLATION_UNIT:
+                self._fq_name = self._cursor.spelling
+            else:
+                self._fq_name = self._cache.get(parent).fq_name + '::' + self._cursor.spelling
+        return self._fq_name
+
+    @property
+    def id(self) -> str:
+        if not self._id_resolved:
+            if self._cursor.spelling in SPECIAL_TEMPLATE_FUNC:
+                self._id = self.fq_name
+            elif self.mangled_name is not None and self.mangled_name != '':
+                self._id = self.mangled_name
+            self._id_resolved = True
+        return self._id
+
+    @property
+    def is_valid(self) -> bool:
+        if self._is_valid is None:
+            self._is_valid = self.file in self._cache.config.imgui_sources \
+                and self._cursor.spelling not in BLACKLIST \
+                and self.id is not None
+        return self._is_valid
+
+class CursorIdentityCache:
+    """
+        Memoize cursor identities so all traversal passes share the libclang lookups
+        already made for a function. The key is the cursor hash, which the bindings keep on the cursor object,
+        so a hit costs at most one libclang call. The USR is not part of the key: a declaration and its definition
+        share it but not their files.
+    """
+    def __init__(self, config):
+        self.config = config
+        self._identities : dict[int, CursorIdentity] = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cursor: clang.cindex.Cursor) -> CursorIdentity:
+        identity = self._identities.get(cursor.hash)
+        if identity is None:
+            self.misses += 1
+            identity = CursorIdentity(self, cursor)
+            self._identities[cursor.hash] = identity
+        else:
+            self.hits += 1
+        return identity
+
+    def get_id(self, cursor: clang.cindex.Cursor) -> str:
+        return self.get(cursor).id
+
+    def get_fully_qualified_name(self, cursor: clang.cindex.Cursor) -> str:
+        return self.get(cursor).fq_name
+
+    def is_valid_func(self, cursor: clang.cindex.Cursor) -> bool:
+        return cursor is not None and self.get(cursor).is_valid
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __str__(self):
+        return '{} lookups, {} hits, {} misses (hit rate {:.1f}%)'.format(self.hits + self.misses, self.hits, self.misses, 100.0 * self.hit_rate())
+
 class Config:
     def __init__(self, root_folder):
         self.root_folder = pathlib.Path(root_folder).resolve()
         self.imgui_h = self.root_folder / 'imgui.h'
+        self.imconfig_h = self.root_folder / 'imconfig.h'
         self.imstb_textedit = self.root_folder / 'imstb_textedit.h'
         self.imgui_internal_h = self.root_folder / 'imgui_internal.h'
         self.imgui_cpp = self.root_folder / 'imgui.cpp'
@@ -101,6 +393,7 @@ class Config:
         self.this_script = pathlib.Path(__file__).resolve()
         self.script_root = self.this_script.parent.resolve()
         self.test_cpp =  self.script_root / 'test/test.cpp'
+        self.benchmark_cpp = self.script_root / 'test/benchmark.cpp'
         self.imgui_sources = set([
             self.imgui_h,
             self.imgui_internal_h,
@@ -111,12 +404,10 @@ class Config:
             self.imgui_demo,
             self.imstb_textedit
         ])
+        self.identity_cache = CursorIdentityCache(self)
 
     def is_valid_func(self, cursor):
-        return cursor is not None \
-            and pathlib.Path(str(cursor.location.file)) in self.imgui_sources \
-            and cursor.spelling not in BLACKLIST \
-            and get_id(cursor) is not None
+        return self.identity_cache.is_valid_func(cursor)
 
 
 class TransformStrRequest:
@@ -142,19 +433,23 @@ class SourceLine:
     def request_replace_context(self, implicit_context : CodeRange):
         assert self.replace_context is None
         self.replace_context = TransformStrRequest(implicit_context.start_column - 1, implicit_context.end_column - 1, 'GImGui', 'ctx')
+        return self.replace_context
 
     def request_replace(self, req : TransformStrRequest):
         self.other_request.append(req)
+        return req
 
     def request_replace_proto(self, code_range: CodeRange, name: str, has_arg: bool):
         assert self.transform_proto is None
         arg = 'ImGuiContext* ctx' + (', ' if has_arg > 0 else '')
         self.transform_proto = TransformStrRequest(code_range.start_column - 1, code_range.end_column , name + '(', name + '(' + arg)
+        return self.transform_proto
 
     def request_replace_call(self, var_name: str, code_range: CodeRange, name: str, has_arg):
         arg = var_name + (', ' if has_arg > 0 else '')
         request = TransformStrRequest(code_range.start_column - 1, code_range.end_column, name + '(', name + '(' + arg)
         self.transform_call.append(request)
+        return request
 
     def transform(self):
         requests : list[TransformStrRequest] = list()
@@ -196,6 +491,87 @@ class SourceLine:
         assert source.line == 'inline MyFunc(ImGuiContext* ctx, int a, float val = 0.f) { ImGuiContext& g = *ctx; Foo(ctx, 28); SuperBar(ctx); Foo(ctx, 29);', 'Source test failed'
 
 
+class Edit:
+    """
+        One modification planned by the analysis: `request` applies to line `line` of `path`
+        and is made on behalf of `function`. `kind` is one of `TraceWriter.CATEGORIES`.
+    """
+    def __init__(self, kind: str, function: str, path: pathlib.Path, line: int, request: TransformStrRequest):
+        self.kind = kind
+        self.function = function
+        self.path = path
+        self.line = line
+        self.request = request
+
+class TraceWriter:
+    """
+        Write one JSON record per edit in a JSONL file.
+        Records are serialized and written by a background thread with a large buffer,
+        so tracing a full conversion does not slow down the analysis.
+    """
+    CATEGORIES = [
+        'context',  # `GImGui` replaced with `ctx`
+        'proto',    # `ImGuiContext* ctx` added to a prototype
+        'param',    # existing ImGuiContext parameter renamed to `ctx`
+        'fmt',      # IM_FMTARGS/IM_FMTLIST index shifted
+        'call',     # context forwarded to a call
+        'log',      # context forwarded to an IMGUI_DEBUG_LOG* macro
+        'shim',     # implicit API header included from imgui.h
+        'tls',      # `GImGui` declared thread_local
+    ]
+
+    def __init__(self, path, root_folder: pathlib.Path, categories: Iterable[str] = None):
+        self.path = pathlib.Path(path)
+        self.root_folder = root_folder
+        self.categories = set(categories) if categories is not None else set(TraceWriter.CATEGORIES)
+        for category in self.categories:
+            assert category in TraceWriter.CATEGORIES, "Unknown trace category '{}'".format(category)
+        self.count = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_records, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def parse_categories(value: str) -> list[str]:
+        """
+            Argument type of `--trace-categories`: a comma separated list of CATEGORIES
+        """
+        categories = value.split(',')
+        for category in categories:
+            if category not in TraceWriter.CATEGORIES:
+                raise argparse.ArgumentTypeError("unknown trace category '{}', valid categories are: {}".format(category, ', '.join(TraceWriter.CATEGORIES)))
+        return categories
+
+    def record(self, edit: Edit):
+        if edit.kind in self.categories:
+            self.count += 1
+            self._queue.put(edit)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write_records(self):
+        with open(self.path, 'w', buffering=1024 * 1024) as file:
+            while True:
+                edit : Edit = self._queue.get()
+                if edit is None:
+                    break
+                path = edit.path
+                try:
+                    path = path.relative_to(self.root_folder)
+                except ValueError:
+                    pass
+                file.write(json.dumps({
+                    'kind': edit.kind,
+                    'function': edit.function,
+                    'file': path.as_posix(),
+                    'range': [edit.line, edit.request.start + 1, edit.line, edit.request.end + 1],
+                    'before': edit.request.before,
+                    'after': edit.request.after,
+                }))
+                file.write('\n')
+
 class ParsingContext:
     def __init__(self, tu: clang.cindex.TranslationUnit, config: Config):
         self.tu = tu
@@ -219,6 +595,11 @@ class ParsingContext:
             'IMGUI_DEBUG_LOG_DOCKING',
             'IMGUI_DEBUG_LOG_VIEWPORT'
         ]
+        # Recent versions add their own categories, e.g. IMGUI_DEBUG_LOG_FONT
+        with open(config.imgui_internal_h) as file:
+            for symbol in re.findall(r'#define\s+(IMGUI_DEBUG_LOG_\w+)\(', file.read()):
+                if symbol not in self._log_symbols:
+                    self._log_symbols.append(symbol)
 
     def _add_source(self, path):
         if not isinstance(path, pathlib.Path):
@@ -236,6 +617,13 @@ class ParsingContext:
         assert path in self._sources
         return self._sources[path][line - 1].line
 
+    def get_line_count(self, path) -> int:
+        if isinstance(path, str):
+            path = pathlib.Path(str(path))
+
+        assert path in self._sources
+        return len(self._sources[path])
+
     def find_until(self, path, line_num : int, column_num : int,  search_char : str) -> CodeRange:
         """
             Find a string `symbol` in a line and return a CodeRange. Start search at `column_num`
@@ -288,18 +676,18 @@ class ParsingContext:
 
     def request_replace_context(self, implicit_context : CodeRange):
         assert implicit_context.file in self._sources
-        self._sources[implicit_context.file][implicit_context.start_line - 1].request_replace_context(implicit_context)
+        return self._sources[implicit_context.file][implicit_context.start_line - 1].request_replace_context(implicit_context)
 
     def request_replace(self, path : pathlib.Path, line: int, request : TransformStrRequest):
-        self._sources[path][line - 1].request_replace(request)
+        return self._sources[path][line - 1].request_replace(request)
 
     def request_replace_proto(self, path : pathlib.Path, line: int, code_range: CodeRange, name: str, has_arg : bool):
         assert path in self._sources
-        self._sources[path][line - 1].request_replace_proto(code_range, name, has_arg)
+        return self._sources[path][line - 1].request_replace_proto(code_range, name, has_arg)
 
     def request_replace_call(self, path : pathlib.Path, line: int, var_name: str,  code_range: CodeRange, name: str, has_arg : int):
         assert path in self._sources
-        self._sources[path][line - 1].request_replace_call(var_name, code_range, name, has_arg)
+        return self._sources[path][line - 1].request_replace_call(var_name, code_range, name, has_arg)
 
     def transform_sources(self):
         for path, source in self._sources.items():
@@ -328,10 +716,11 @@ def format_type_name(type_name):
     return result
 
 class FunctionParameter:
-    def __init__(self, name : str, type : str, declaration : str, code_range : CodeRange):
+    def __init__(self, name : str, type : str, declaration : str, code_range : CodeRange = None, canonical_type : str = None):
         self.name : str = name
         self.type : str = format_type_name(type)
         self.code_range = code_range
+        self.canonical_type : str = canonical_type # Type with the typedefs resolved, e.g. `unsigned int` for ImGuiID
         
         self.declaration : str = declaration
         if self.declaration is None:
@@ -381,17 +770,21 @@ class FunctionEntry:
             arg_code_range = CodeRange.from_source_range(arg.extent)
             declaration = ctx.get_string(arg_code_range)
             assert declaration is not None, "Cannot parse declaration of this arg: {} '{}'".format(arg.kind, arg.spelling)
-            function_param = FunctionParameter(arg.spelling, arg.type.spelling, declaration, arg_code_range)
+            function_param = FunctionParameter(arg.spelling, arg.type.spelling, declaration, arg_code_range, arg.type.get_canonical().spelling)
             if 'ImGuiContext' in declaration:
                 self.imgui_context_arg = function_param
             params.append(function_param)
 
+        self.cursor = cursor
         self.kind = cursor.kind
         self.name : str = cursor.spelling
-        self.fq_name : str = get_fully_qualified_name(cursor)
-        self.id : str = cursor.mangled_name if cursor.kind != CursorKind.FUNCTION_TEMPLATE else self.fq_name
+        self.fq_name : str = ctx.config.identity_cache.get_fully_qualified_name(cursor)
+        identity = ctx.config.identity_cache.get(cursor)
+        self.id : str = identity.mangled_name if cursor.kind != CursorKind.FUNCTION_TEMPLATE else self.fq_name
+        self.usr : str = identity.usr
         assert self.id is not None and self.id != ''
         self.code_range : CodeRange = CodeRange.from_source_location(cursor.location, len(cursor.spelling))
+        self.end_line : int = cursor.extent.end.line
         self.return_type : str = format_type_name(cursor.type.get_result().spelling)
         self.params : list[FunctionParameter] = params
         self.param_count = len(list(cursor.type.argument_types()))
@@ -401,12 +794,14 @@ class FunctionEntry:
         self.fmtlist = int(ctx.get_string(fmtlist_range)) if fmtlist_range is not None else 0
         self.location=cursor.location
         
-        self.method_class = get_fully_qualified_name(cursor.semantic_parent) if (cursor.kind == CursorKind.CXX_METHOD) else None
+        self.method_class = ctx.config.identity_cache.get_fully_qualified_name(cursor.semantic_parent) if (cursor.kind == CursorKind.CXX_METHOD) else None
         self.is_definition=cursor.is_definition()
+        self.is_variadic = cursor.kind != CursorKind.FUNCTION_TEMPLATE and cursor.type.kind == TypeKind.FUNCTIONPROTO and cursor.type.is_function_variadic()
 
         self.visited = False
         self.need_context_param = False
         self.implicit_contexts : list[CodeRange] = []
+        self.configurations : set[str] = set() # Names of the DEFINE_MATRIX configurations where this entry is compiled
 
         # hardcoded cases
         if self.name == 'GetKeyIndex':
@@ -431,6 +826,10 @@ class FunctionEntry:
                 if (code_range.start_column == code_range.end_column):
                     code_range = ctx.find_symbol(code_range.file, code_range.start_line, code_range.start_column, 'GImGui')
                     assert code_range is not None
+                if code_range.start_line != code_range.end_line or ctx.get_string(code_range) != 'GImGui':
+                    # Expanded from the body of a macro, e.g. IMGUI_DEBUG_LOG_FONT, which has to be converted by hand
+                    print('WARNING: `GImGui` used by a macro in {} at {}:{}'.format(self.name, code_range.file, code_range.start_line))
+                    return False
 
                 self.implicit_contexts.append(code_range)
                 return False
@@ -440,6 +839,24 @@ class FunctionEntry:
         assert self.name is not None
         assert self.return_type is not None
 
+    def merge(self, other: FunctionEntry):
+        """
+            Merge the same entry found in another configuration, whose body may use `GImGui` in different places
+        """
+        assert self.id == other.id and self.code_range == other.code_range
+        for c in other.implicit_contexts:
+            if c not in self.implicit_contexts:
+                self.implicit_contexts.append(c)
+        self.configurations |= other.configurations
+
+    def __getstate__(self):
+        # libclang objects cannot leave the process which parsed them
+        state = self.__dict__.copy()
+        state['cursor'] = None
+        state['kind'] = None
+        state['location'] = None
+        return state
+
     def is_valid(self, ctx: ParsingContext) -> bool:
         if self.name != ctx.get_string(self.code_range):
             return False
@@ -461,21 +878,7 @@ class FunctionEntry:
         return NotImplemented
 
     def __str__(self):
-        params = self.params
-        arg_offset = 0
-
-        suffix = ''
-        if self.fmtlist > 0:
-            suffix = ' IM_FMTLIST({})'.format(self.fmtlist + arg_offset)
-        if self.fmtargs > 0:
-            suffix = ' IM_FMTARGS({})'.format(self.fmtargs + arg_offset)
-            params = params + [FunctionParameter('...', '', '...')]
-        return 'IMGUI_API {type} {name}({signature}){suffix};'.format(
-            type=self.return_type, 
-            name=self.name, 
-            signature=make_signature(params),
-            suffix=suffix
-        )
+        return format_prototype(self.return_type, self.name, self.params, self.fmtargs, self.fmtlist)
 
 class CallEntry:
     def __init__(self, caller, callee, code_range, call_name, has_arg : bool):
@@ -500,8 +903,10 @@ class CallEntry:
 class FunctionDatabase:
     """
         Assumption all entry always at least a definition, and sometimes a declaration too.
+        When the entries come from several configurations, the same entry can be given several times,
+        and a function can have alternative definitions, e.g. the stubs compiled with IMGUI_DISABLE_DEMO_WINDOWS.
     """
-    def __init__(self, ctx: ParsingContext, funcs : list[FunctionEntry]):
+    def __init__(self, ctx: ParsingContext, funcs : list[FunctionEntry], allow_undefined=False):
         self._ctx = ctx
         self._declarations : dict[str, FunctionEntry] = dict()
         self._definitions : dict[str, FunctionEntry] = dict()
@@ -509,20 +914,35 @@ class FunctionDatabase:
         self._callee_to_call : dict[FunctionEntry, set(CallEntry)] = dict()
         self._calls : dict[CallEntry, CallEntry] = dict()
         self._log_call : set[(str, CodeRange)] = set()
+        self._usr_to_id : dict[str, str] = dict()
+        self._alternatives : dict[str, list[FunctionEntry]] = dict()
+        self.conflicts : list[tuple[CallEntry, CallEntry]] = []
+        entries : dict[tuple[str, CodeRange], FunctionEntry] = dict()
         for f in funcs:
+            self._usr_to_id[f.usr] = f.id
+            entry = entries.get((f.id, f.code_range))
+            if entry is not None:
+                entry.merge(f)
+                continue
+            entries[(f.id, f.code_range)] = f
+
             if f.is_definition:
-                assert f.id not in self._definitions
-                self._definitions[f.id] = f
+                if f.id in self._definitions:
+                    self._alternatives.setdefault(f.id, []).append(f)
+                else:
+                    self._definitions[f.id] = f
             else:
                 if f.id in self._declarations:
-                    print('WARNING: {} is declared in {} and in {}'.format(f.fq_name, f.location, self._declarations[f.id].location))
-                    if pathlib.Path(str(f.location.file)) != ctx.config.imgui_demo:
+                    print('WARNING: {} is declared in {} and in {}'.format(f.fq_name, f.code_range, self._declarations[f.id].code_range))
+                    if f.code_range.file != ctx.config.imgui_demo:
                         self._declarations[f.id] = f
                 else:
                     self._declarations[f.id] = f
 
-        for f in funcs:
-            assert f.id in self._definitions
+        # A configuration may only compile the declaration of a function, which is ignored
+        for id in [id for id in self._declarations.keys() if id not in self._definitions]:
+            assert allow_undefined, '{} is declared but not defined'.format(self._declarations[id].fq_name)
+            del self._declarations[id]
 
         for f in self._definitions.values():
             self._caller_to_call[f] = set()
@@ -530,6 +950,12 @@ class FunctionDatabase:
             if f.id not in self._declarations:
                 self._declarations[f.id] = f
 
+    def find_id(self, usr: str) -> str:
+        """
+            Return the id of the function whose USR is `usr`, or None if that function is not part of the database
+        """
+        return self._usr_to_id.get(usr)
+
     def iter_declarations(self) -> Iterable[FunctionEntry]:
         for decl in self._declarations.values():
             yield decl
@@ -537,6 +963,9 @@ class FunctionDatabase:
     def iter_definitions(self) -> Iterable[FunctionEntry]:
         for decl in self._definitions.values():
             yield decl
+        for alternatives in self._alternatives.values():
+            for alternative in alternatives:
+                yield alternative
 
     def iter_calls(self) -> Iterable[CallEntry]:
         for call in self._calls.values():
@@ -553,8 +982,15 @@ class FunctionDatabase:
             if decl.code_range != definition.code_range:
                 yield decl
             yield definition
+            for alternative in self._alternatives.get(id, []):
+                yield alternative
 
-    def add_call(self, caller_id: str, callee_id: str, code_range: CodeRange, call_name:str):
+    def add_call(self, caller_id: str, callee_id: str, code_range: CodeRange, call_name:str, merge=False):
+        """
+            Add a call between two functions of the database. With `merge`, the call comes from another configuration
+            and may already be known. Otherwise a call is only seen twice when it is in a macro argument expanded twice,
+            e.g. `IM_MAX(1.0f, GetFontSize())`.
+        """
         caller = self._definitions.get(caller_id)
         callee = self._definitions.get(callee_id)
         if caller is not None and callee is not None:
@@ -564,22 +1000,25 @@ class FunctionDatabase:
             text = self._ctx.get_string(param_code_range)
             assert text[0] == '('
             call = CallEntry(caller, callee, code_range, call_name, text != '()')
-            if call in self._calls:
-                prev_call = self._calls[call]
-                assert call not in self._calls
+            prev_call = self._calls.get(call)
+            if prev_call is not None:
+                if prev_call.callee != callee:
+                    assert merge, 'the call at {} is found to {} and to {}'.format(code_range, prev_call.callee.fq_name, callee.fq_name)
+                    self.conflicts.append((prev_call, call))
+                return
 
             self._calls[call] = call
             self._caller_to_call[caller].add(call)
             self._callee_to_call[callee].add(call)
 
-    def add_log_call(self, name : str, code_range : CodeRange, method_class : str):
-        assert code_range not in self._log_call
+    def add_log_call(self, name : str, code_range : CodeRange, method_class : str, merge=False):
+        assert merge or (name, code_range, method_class) not in self._log_call
         self._log_call.add((name, code_range, method_class))
 
     def compute_context_need(self):
-        for id, func in self._definitions.items():
+        for func in self.iter_definitions():
             if len(func.implicit_contexts) > 0:
-                self._set_need_context_recursive(func)
+                self._set_need_context_recursive(self._definitions[func.id])
 
     def debug_print_calls(self):
         for call in self.iter_calls():
@@ -607,6 +1046,8 @@ class FunctionDatabase:
 
         decl_entry.need_context_param = True
         def_entry .need_context_param = True
+        for alternative in self._alternatives.get(callee.id, []):
+            alternative.need_context_param = True
 
         for call in self._callee_to_call[callee]:
             self._set_need_context_recursive(call.caller)
@@ -646,22 +1087,6 @@ def iterate_recursive(parent: clang.cindex.Cursor) -> Iterable[clang.cindex.Curs
         for child in iterate_recursive(cursor):
             yield child
 
-def get_fully_qualified_name(cursor: clang.cindex.Cursor) -> str:
-    res = cursor.spelling
-    cursor = cursor.semantic_parent
-    while cursor.kind != CursorKind.TRANSLATION_UNIT:
-        res = cursor.spelling + '::' + res
-        cursor = cursor.semantic_parent
-    return res
-
-def get_id(cursor: clang.cindex.Cursor) -> str:
-    if cursor.spelling in SPECIAL_TEMPLATE_FUNC:
-        return get_fully_qualified_name(cursor)
-    elif cursor.mangled_name is not None and cursor.mangled_name != '':
-        return cursor.mangled_name
-    else:
-        return None
-
 def visit_cursor(parent: clang.cindex.Cursor, requested_kinds: CursorKind , callback, stack = [], debug_stack = []):
     cursor : clang.cindex.Cursor
     for cursor in parent.get_children():
@@ -689,8 +1114,9 @@ def find_function(ctx: ParsingContext, config: Config, verbose=False):
     def add_function_visitor(cursor_stack: list[clang.cindex.Cursor]):
         assert len(cursor_stack) > 0
         cursor = cursor_stack[-1]
-        if pathlib.Path(str(cursor.location.file)) in ctx.config.imgui_sources:
-            if cursor.mangled_name == '' and not cursor.kind == CursorKind.FUNCTION_TEMPLATE:
+        identity = config.identity_cache.get(cursor)
+        if identity.file in ctx.config.imgui_sources:
+            if identity.mangled_name == '' and not cursor.kind == CursorKind.FUNCTION_TEMPLATE:
                 if verbose:
                     print('mangle error in {} ({})'.format(cursor.spelling, cursor.location))
             elif config.is_valid_func(cursor):
@@ -725,16 +1151,30 @@ def find_function_call(ctx: ParsingContext, config: Config, func_db : FunctionDa
                 func_cursor = c
                 break
 
-        assert func_cursor is not None
+        if func_cursor is None:
+            # Nested calls outside of any function, e.g. in the initializer of a global variable of a system header
+            return True
         call_cursor = cursor_stack[-1]
 
         if func_cursor.kind in [CursorKind.CONSTRUCTOR, CursorKind.DESTRUCTOR, CursorKind.CONVERSION_FUNCTION]:
             return True
 
-        definition = call_cursor.get_definition()
-        if config.is_valid_func(func_cursor) and config.is_valid_func(definition):
-            extent = call_cursor.extent
-            if definition.spelling in SPECIAL_TEMPLATE_FUNC:
+        # Only calls to functions collected by `find_function` matter, anything else is rejected
+        # before asking libclang for more than the referenced USR.
+        referenced = call_cursor.referenced
+        if referenced is None:
+            return True
+        callee_usr = config.identity_cache.get(referenced).usr
+        callee_id = func_db.find_id(callee_usr)
+        if callee_id is None and '<' in callee_usr and referenced.spelling in SPECIAL_TEMPLATE_FUNC:
+            # A call to a function template references its specialization, whose USR differs
+            # from the template one. Those templates are identified by their qualified name.
+            callee_id = config.identity_cache.get_id(referenced)
+        if callee_id is None:
+            return True
+        caller_id = func_db.find_id(config.identity_cache.get(func_cursor).usr)
+        if caller_id is not None:
+            if referenced.spelling in SPECIAL_TEMPLATE_FUNC:
                 code_range = ctx.find_until(call_cursor.location.file, call_cursor.location.line, call_cursor.location.column, '(')
                 text = ctx.get_string(code_range)
                 i = True
@@ -745,11 +1185,12 @@ def find_function_call(ctx: ParsingContext, config: Config, func_db : FunctionDa
                 code_range.end_column = code_range.end_column - 1 # Remove the '(')
                 text = ctx.get_string(code_range)
                 assert text.startswith(call_cursor.spelling)
-                func_db.add_call(get_id(func_cursor), get_id(definition), code_range, text)
+                func_db.add_call(caller_id, callee_id, code_range, text)
             elif call_cursor.spelling == 'DebugLog':
                 name, code_range = ctx.find_log_symbol(call_cursor.location)
                 assert name is not None and code_range is not None
-                func_db.add_log_call(name, code_range, get_fully_qualified_name(func_cursor.semantic_parent) if func_cursor.kind == CursorKind.CXX_METHOD else None)
+                method_class = config.identity_cache.get_fully_qualified_name(func_cursor.semantic_parent) if func_cursor.kind == CursorKind.CXX_METHOD else None
+                func_db.add_log_call(name, code_range, method_class)
             else:
                 if verbose:
                     print('WARNING: {} cannot be found at {}'.format(call_cursor.spelling, call_cursor.location))
@@ -758,11 +1199,19 @@ def find_function_call(ctx: ParsingContext, config: Config, func_db : FunctionDa
 
     visit_cursor(ctx.tu.cursor, [CursorKind.FUNCTION_DECL, CursorKind.CONSTRUCTOR, CursorKind.DESTRUCTOR, CursorKind.CONVERSION_FUNCTION, CursorKind.CXX_METHOD, CursorKind.FUNCTION_TEMPLATE, CursorKind.CALL_EXPR], function_visitor)
 
+def plan_edits(ctx: ParsingContext, func_db : FunctionDatabase, verbose=False) -> list[Edit]:
+    """
+        Find which functions need a context, then request the modifications adding it
+        to their prototype, their calls and the IMGUI_DEBUG_LOG* macros.
+        Return the planned edits.
+    """
     func_db.compute_context_need()
 
+    edits : list[Edit] = []
     for func in func_db.iter_definitions():
         for implicit_context in func.implicit_contexts:
-            ctx.request_replace_context(implicit_context)
+            req = ctx.request_replace_context(implicit_context)
+            edits.append(Edit('context', func.fq_name, implicit_context.file, implicit_context.start_line, req))
             if verbose:
                 print('Replace `GImGui` with `context` in {} at {}'.format(func.fq_name, implicit_context))
 
@@ -772,32 +1221,40 @@ def find_function_call(ctx: ParsingContext, config: Config, func_db : FunctionDa
                 if func.fmtargs_range is not None:
                     req = TransformStrRequest(func.fmtargs_range.start_column - 1, func.fmtargs_range.end_column - 1, str(func.fmtargs), str(func.fmtargs + 1))
                     ctx.request_replace(func.fmtargs_range.file, func.fmtargs_range.start_line, req)
+                    edits.append(Edit('fmt', func.fq_name, func.fmtargs_range.file, func.fmtargs_range.start_line, req))
                 if func.fmtlist_range is not None:
                     req = TransformStrRequest(func.fmtlist_range.start_column - 1, func.fmtlist_range.end_column - 1, str(func.fmtlist), str(func.fmtlist + 1))
                     ctx.request_replace(func.fmtlist_range.file, func.fmtlist_range.start_line, req)
+                    edits.append(Edit('fmt', func.fq_name, func.fmtlist_range.file, func.fmtlist_range.start_line, req))
 
             if func.imgui_context_arg is None:
                 has_arg = func.param_count > 0
-                ctx.request_replace_proto(func.code_range.file, func.code_range.start_line, func.code_range, func.name, has_arg)
+                req = ctx.request_replace_proto(func.code_range.file, func.code_range.start_line, func.code_range, func.name, has_arg)
+                edits.append(Edit('proto', func.fq_name, func.code_range.file, func.code_range.start_line, req))
                 if verbose:
                     print('Add `ImGuiContext* context` to {} at {}'.format(func.fq_name, func.code_range))
             elif 'ctx' not in func.imgui_context_arg.declaration:
                 arg = func.imgui_context_arg
                 req = TransformStrRequest(arg.code_range.start_column - 1, arg.code_range.end_column - 1, arg.declaration, 'ImGuiContext* ctx')
                 ctx.request_replace(arg.code_range.file, arg.code_range.start_line, req)
+                edits.append(Edit('param', func.fq_name, arg.code_range.file, arg.code_range.start_line, req))
 
     for call in func_db.iter_calls():
         if call.callee.need_context_param and call.callee.imgui_context_arg is None:
             var_name = 'Ctx' if call.caller.method_class in CLASS_WITH_CONTEXT else 'ctx'
-            ctx.request_replace_call(call.code_range.file, call.code_range.start_line, var_name, call.code_range, call.call_name, call.has_arg)
+            req = ctx.request_replace_call(call.code_range.file, call.code_range.start_line, var_name, call.code_range, call.call_name, call.has_arg)
+            edits.append(Edit('call', call.caller.fq_name, call.code_range.file, call.code_range.start_line, req))
             if verbose:
                 print('Forward `context` to {} at {}'.format(call.callee.fq_name, call.code_range))
     
     for name, code_range, method_class in func_db.iter_log_calls():
         var_name = 'Ctx' if method_class in CLASS_WITH_CONTEXT else 'ctx'
-        ctx.request_replace_call(code_range.file, code_range.start_line, var_name, code_range, name, True)
+        req = ctx.request_replace_call(code_range.file, code_range.start_line, var_name, code_range, name, True)
+        edits.append(Edit('log', name, code_range.file, code_range.start_line, req))
         if verbose:
-            print('Forward `context` to {} at {}'.format(call.callee.fq_name, call.code_range))
+            print('Forward `context` to {} at {}'.format(name, code_range))
+
+    return edits
 
 def make_signature(params: list[FunctionParameter], with_default=True) -> str:
     """
@@ -815,6 +1272,23 @@ def make_signature(params: list[FunctionParameter], with_default=True) -> str:
                 return x
         return ', '.join([strip_after_equal(str(p)) for p in params])
 
+def format_prototype(return_type: str, name: str, params: list[FunctionParameter], fmtargs: int, fmtlist: int) -> str:
+    """
+        Return the IMGUI_API declaration of a function, with its IM_FMTARGS or IM_FMTLIST annotation
+    """
+    suffix = ''
+    if fmtlist > 0:
+        suffix = ' IM_FMTLIST({})'.format(fmtlist)
+    if fmtargs > 0:
+        suffix = ' IM_FMTARGS({})'.format(fmtargs)
+        params = params + [FunctionParameter('...', '', '...')]
+    return 'IMGUI_API {type} {name}({signature}){suffix};'.format(
+        type=return_type,
+        name=name,
+        signature=make_signature(params),
+        suffix=suffix
+    )
+
 def make_args(params: list[FunctionParameter]) -> str:
     """
         Given the list of FunctionParameter, return a string containing a valid C++ list of argument
@@ -822,23 +1296,381 @@ def make_args(params: list[FunctionParameter]) -> str:
     """
     return ', '.join([p.name for p in params])
 
-def replace_in_file(path, pairs):
-    with open(path, 'r') as file :
-        filedata = file.read()
+def find_preprocessor_guards(lines: list[str], ignored: set[str]) -> list[tuple[str, ...]]:
+    """
+        Return, for each line, the preprocessor conditions enclosing it as a tuple of `#if`/`#ifdef`/`#ifndef` directives.
+        `#else` and `#elif` branches are expressed as the negation of the previous conditions.
+        Conditions on macros in `ignored` are left out.
+    """
+    def negate(expr):
+        if expr.startswith('!defined(') and expr.count('(') == 1:
+            return expr[1:]
+        if expr.startswith('defined(') and expr.count('(') == 1:
+            return '!' + expr
+        return '!({})'.format(expr)
+
+    def render(expr):
+        if expr.startswith('!defined(') and expr.count('(') == 1:
+            return '#ifndef ' + expr[len('!defined('):-1]
+        if expr.startswith('defined(') and expr.count('(') == 1:
+            return '#ifdef ' + expr[len('defined('):-1]
+        return '#if ' + expr
+
+    guards = []
+    # One (current condition, previous branch conditions) per nested #if
+    stack : list[tuple[str, list[str]]] = []
+    for line in lines:
+        directive = line.strip()
+        if directive.startswith('#'):
+            words = directive[1:].split(None, 1)
+            keyword = words[0] if len(words) > 0 else ''
+            argument = words[1].split('//')[0].strip() if len(words) > 1 else ''
+            if keyword == 'ifdef':
+                stack.append(('defined({})'.format(argument), []))
+            elif keyword == 'ifndef':
+                stack.append(('!defined({})'.format(argument), []))
+            elif keyword == 'if':
+                stack.append((argument, []))
+            elif keyword in ['elif', 'else'] and len(stack) > 0:
+                current, previous = stack.pop()
+                previous = previous + [current]
+                conditions = [negate(c) for c in previous]
+                if keyword == 'elif':
+                    conditions.append('({})'.format(argument))
+                stack.append((' && '.join(conditions), previous))
+            elif keyword == 'endif' and len(stack) > 0:
+                stack.pop()
+        guards.append(tuple(render(expr) for expr, _ in stack if not any('defined({})'.format(macro) == expr.lstrip('!') for macro in ignored)))
+    return guards
+
+def generate_implicit_api(ctx: ParsingContext, config: Config, apis: list[FunctionEntry], thread_safe=False) -> dict[pathlib.Path, str]:
+    """
+        Generate the backward compatible implicit context API on top of the explicit one.
+        Return the content of `imguiex.h` and `imgui_implicit.cpp`.
+
+        `imguiex.h` is included at the end of imgui.h. Every API which received an `ImGuiContext* ctx` parameter
+        gets an inline forwarder with the original signature, default arguments included, which loads `GImGui` once
+        and calls the explicit version, so the compiler can remove the indirection entirely.
+        Variadic functions cannot be inlined through `va_start`, so they are declared in `imguiex.h`
+        and forwarded to their `va_list` variant in `imgui_implicit.cpp`.
+        A literal `0`, `NULL` or `nullptr` given as first argument converts to `ImGuiContext*` as well as to a pointer
+        or a non-int arithmetic parameter, so calls such as `ShowDemoWindow(NULL)` or `SameLine(0)` would be ambiguous.
+        Those functions get a second forwarder, a template taking only the types of those literals, which is an exact match.
+        Each function keeps the preprocessor conditions of its declaration, e.g. IMGUI_DISABLE_OBSOLETE_FUNCTIONS.
+        With `thread_safe`, `GImGui` is declared thread_local like in imgui_internal.h.
+    """
+    header : list[tuple[tuple[str, ...], list[str]]] = []
+    source : list[tuple[tuple[str, ...], list[str]]] = []
+    imgui_h_lines = [ctx.get_line(config.imgui_h, i + 1) for i in range(ctx.get_line_count(config.imgui_h))]
+    imgui_h_guards = find_preprocessor_guards(imgui_h_lines, ignored=set(['IMGUI_DISABLE']))
+
+    converted = [f for f in apis if f.need_context_param and f.imgui_context_arg is None]
+    converted.sort(key=lambda f: f.code_range.start_line)
+
+    def find_va_list_variant(func: FunctionEntry) -> FunctionEntry:
+        for f in apis:
+            if f.name == func.name + 'V' and len(f.params) == len(func.params) + 1 \
+                and [p.type for p in f.params[:-1]] == [p.type for p in func.params]:
+                return f
+        return None
+
+    def literal_kind(param: FunctionParameter) -> str:
+        """
+            `Null` when a literal 0, NULL or nullptr given for `param` is ambiguous with the context, `Int` for a literal 0 only
+        """
+        type = param.canonical_type if param.canonical_type is not None else param.type
+        if type.endswith('*') or '(*)' in type:
+            return 'Null'
+        if type.startswith('const ') and type.endswith('&'):
+            type = type[len('const '):-1].strip()
+        return 'Int' if type in LITERAL_AMBIGUOUS_TYPES else None
+
+    def literal_forwarder_kind(func: FunctionEntry) -> str:
+        if func.is_variadic or len(func.params) == 0 or literal_kind(func.params[0]) is None:
+            return None
+        # The explicit overload only takes as many arguments as the implicit one when a parameter has a default value
+        if not any('=' in p.declaration for p in func.params):
+            return None
+        # When another overload takes a literal first argument, e.g. `PushID(int)`, the call is resolved, or ambiguous, like before the conversion
+        for other in apis:
+            if other is not func and other.name == func.name and len(other.params) > 0:
+                first = other.params[0]
+                if literal_kind(first) is not None or (first.canonical_type if first.canonical_type is not None else first.type) == 'int':
+                    return None
+        return literal_kind(func.params[0])
+
+    def context_args(func: FunctionEntry, params: list[FunctionParameter]) -> str:
+        args = make_args(params)
+        if func.need_context_param and func.imgui_context_arg is None:
+            return 'GImGui' + (', ' + args if len(args) > 0 else '')
+        return args
+
+    for func in converted:
+        guard = imgui_h_guards[func.code_range.start_line - 1]
+        if not func.is_variadic:
+            lines = ['    inline {} {}({}) {{ return {}({}); }}'.format(func.return_type, func.name, make_signature(func.params), func.name, context_args(func, func.params))]
+            kind = literal_forwarder_kind(func)
+            if kind is not None:
+                first = func.params[0]
+                rest = func.params[1:]
+                value = '({})NULL'.format(first.type) if kind == 'Null' else '({})literal'.format(first.type)
+                lines.append('    template<typename T, typename = typename ImGuiImplicitLiteral<T>::{}Type> inline {} {}({}) {{ {}return {}({}); }}'.format(
+                    kind, func.return_type, func.name, make_signature([FunctionParameter('literal', 'T', 'T literal')] + rest),
+                    'IM_ASSERT(literal == 0); ' if kind == 'Null' else '', func.name, ', '.join(['GImGui', value] + [p.name for p in rest])))
+            header.append((guard, lines))
+            continue
 
-    for p in pairs:
-        filedata = filedata.replace(p[0], p[1])
+        variant = find_va_list_variant(func)
+        if variant is None:
+            print('WARNING: {} is variadic but has no va_list variant, it is not part of the implicit API'.format(func.fq_name))
+            continue
 
-    with open(path, 'w') as file:
-        file.write(filedata)
+        header.append((guard, ['    ' + str(func)]))
+        call = '{}({})'.format(variant.name, context_args(variant, func.params + [FunctionParameter('args', 'va_list', None)]))
+        lines = [
+            '{} {}({})'.format(func.return_type, func.fq_name, make_signature(func.params + [FunctionParameter('...', '', '...')], with_default=False)),
+            '{',
+            '    va_list args;',
+            '    va_start(args, {});'.format(func.params[-1].name),
+        ]
+        if func.return_type == 'void':
+            lines += ['    {};'.format(call), '    va_end(args);']
+        else:
+            lines += ['    {} ret = {};'.format(func.return_type, call), '    va_end(args);', '    return ret;']
+        lines += ['}', '']
+        source.append((guard, lines))
 
-def generate(args, config: Config):
-    print('--------')
-    print('CONVERT SETTINGS:')
-    print('  repository path = {}'.format(config.root_folder))
-    print('  apply = {}'.format('enabled' if args.apply else 'disabled'))
-    print('  commit = {}'.format('enabled' if args.commit else 'disabled'))
-    print('--------')
+    def render(entries: list[tuple[tuple[str, ...], list[str]]]) -> str:
+        lines = []
+        current_guard = ()
+        for guard, entry_lines in entries + [((), [])]:
+            common = 0
+            while common < min(len(guard), len(current_guard)) and guard[common] == current_guard[common]:
+                common += 1
+            for directive in reversed(current_guard[common:]):
+                lines.append('#endif // {}'.format(directive))
+            lines += guard[common:]
+            current_guard = guard
+            lines += entry_lines
+        return '\n'.join(lines)
+
+    header_content = \
+'''// dear imgui: implicit context API
+// This file has been generated by the make_explicit_imgui.py script, do not edit it by hand.
+// It is included at the end of imgui.h and provides the backward compatible API using the current context
+// (see ImGui::SetCurrentContext) on top of the explicit API. Define IMGUI_DISABLE_IMPLICIT_API to remove it.
+
+#pragma once
+
+#ifndef IMGUI_DISABLE
+#ifndef IMGUI_DISABLE_IMPLICIT_API
+
+#ifndef GImGui
+extern IMGUI_API {tls}ImGuiContext* GImGui;  // Current implicit context pointer
+#endif
+
+// Types of the literals 0, NULL and nullptr, taken by the template forwarders so a call such as
+// ShowDemoWindow(NULL) or SameLine(0) is an exact match instead of being ambiguous with the explicit API
+template<typename T> struct ImGuiImplicitLiteral {};
+template<> struct ImGuiImplicitLiteral<int> { typedef void IntType; typedef void NullType; };
+template<> struct ImGuiImplicitLiteral<long> { typedef void IntType; typedef void NullType; };
+template<> struct ImGuiImplicitLiteral<long long> { typedef void IntType; typedef void NullType; };
+template<> struct ImGuiImplicitLiteral<decltype(nullptr)> { typedef void NullType; };
+
+namespace ImGui
+{
+{declarations}
+} // namespace ImGui
+
+#endif // #ifndef IMGUI_DISABLE_IMPLICIT_API
+#endif // #ifndef IMGUI_DISABLE
+'''.replace('{tls}', 'thread_local ' if thread_safe else '').replace('{declarations}', render(header))
+
+    source_content = \
+'''// dear imgui: implicit context API
+// This file has been generated by the make_explicit_imgui.py script, do not edit it by hand.
+// It implements the variadic functions of the implicit context API, the other ones are inline functions of imguiex.h.
+
+#include "imgui.h"
+#ifndef IMGUI_DISABLE
+#ifndef IMGUI_DISABLE_IMPLICIT_API
+
+{definitions}
+#endif // #ifndef IMGUI_DISABLE_IMPLICIT_API
+#endif // #ifndef IMGUI_DISABLE
+'''.replace('{definitions}', render(source) + '\n')
+
+    return {
+        config.imguiex_h: header_content,
+        config.imgui_implicit: source_content,
+    }
+
+def request_include_implicit_api(ctx: ParsingContext, config: Config) -> Edit:
+    """
+        Append the include of the implicit API header at the end of imgui.h
+    """
+    line_num = ctx.get_line_count(config.imgui_h)
+    line = ctx.get_line(config.imgui_h, line_num)
+    include = '#include "{}"\n'.format(config.imguiex_h.name)
+    if not line.endswith('\n'):
+        include = '\n' + include
+    req = TransformStrRequest(len(line), len(line), '', '\n// Implicit context API, define IMGUI_DISABLE_IMPLICIT_API to disable it\n' + include)
+    ctx.request_replace(config.imgui_h, line_num, req)
+    return Edit('shim', None, config.imgui_h, line_num, req)
+
+def request_thread_local_context(ctx: ParsingContext, config: Config) -> list[Edit]:
+    """
+        Declare `GImGui` thread_local, so each thread has its own current context
+    """
+    edits : list[Edit] = []
+    cursor : clang.cindex.Cursor
+    for cursor in ctx.tu.cursor.get_children():
+        if cursor.kind != CursorKind.VAR_DECL or cursor.spelling != 'GImGui':
+            continue
+        path = pathlib.Path(str(cursor.location.file))
+        if path not in config.imgui_sources:
+            continue
+        type_ref = next((c for c in cursor.get_children() if c.kind == CursorKind.TYPE_REF), None)
+        assert type_ref is not None, "Cannot find the type of `GImGui` declared at {}".format(cursor.location)
+        line_num = type_ref.extent.start.line
+        column = type_ref.extent.start.column
+        req = TransformStrRequest(column - 1, column - 1, '', 'thread_local ')
+        ctx.request_replace(path, line_num, req)
+        edits.append(Edit('tls', None, path, line_num, req))
+    return edits
+
+def find_context_fallbacks(ctx: ParsingContext, config: Config, func_db: FunctionDatabase, declarations: list[Edit]) -> list[tuple[CodeRange, str]]:
+    """
+        Find the `GImGui` references which are not replaced by the conversion,
+        e.g. in macros or in BLACKLIST functions. Return their range and the function containing them, if any.
+    """
+    converted = set()
+    for func in func_db.iter_definitions():
+        for c in func.implicit_contexts:
+            converted.add((c.file, c.start_line, c.start_column))
+    declaration_lines = set([(edit.path, edit.line) for edit in declarations])
+
+    function_kinds = [CursorKind.FUNCTION_DECL, CursorKind.CXX_METHOD, CursorKind.FUNCTION_TEMPLATE, CursorKind.CONSTRUCTOR, CursorKind.DESTRUCTOR]
+    def enclosing_function(path, line_num, column_num):
+        location = clang.cindex.SourceLocation.from_position(ctx.tu, ctx.tu.get_file(str(path)), line_num, column_num)
+        cursor = clang.cindex.Cursor.from_location(ctx.tu, location)
+        # A location inside a macro expansion or outside any declaration gives an invalid or a translation unit cursor
+        while cursor is not None and not cursor.kind.is_invalid() and cursor.kind != CursorKind.TRANSLATION_UNIT and cursor.kind not in function_kinds:
+            cursor = cursor.semantic_parent
+        if cursor is not None and cursor.kind in function_kinds:
+            return config.identity_cache.get_fully_qualified_name(cursor)
+
+        # Code disabled by the preprocessor has no cursor, look for the function around it
+        enclosing = None
+        for func in func_db.iter_definitions():
+            if func.code_range.file == path and func.code_range.start_line <= line_num <= func.end_line:
+                if enclosing is None or func.code_range.start_line > enclosing.code_range.start_line:
+                    enclosing = func
+        return enclosing.fq_name if enclosing is not None else None
+
+    fallbacks : list[tuple[CodeRange, str]] = []
+    for path in sorted(config.imgui_sources):
+        for line_num in range(1, ctx.get_line_count(path) + 1):
+            code = ctx.get_line(path, line_num).split('//')[0]
+            if 'GImGui' not in code or (path, line_num) in declaration_lines or code.strip().startswith(('#if', '#endif')):
+                continue
+            for match in re.finditer(r'\bGImGui\b', code):
+                if (path, line_num, match.start() + 1) not in converted:
+                    code_range = CodeRange(path, line_num, match.start() + 1, line_num, match.end() + 1)
+                    if code.strip().startswith('#define'):
+                        function = 'macro ' + code.split()[1].split('(')[0]
+                    else:
+                        function = enclosing_function(path, line_num, match.start() + 1)
+                    fallbacks.append((code_range, function))
+    return fallbacks
+
+def find_shared_writes(ctx: ParsingContext, config: Config, func_db: FunctionDatabase) -> list[tuple[FunctionEntry, str, CodeRange, set[str]]]:
+    """
+        Find the global and static variables written by the functions receiving a context.
+        Those variables are shared by all contexts, so using contexts on parallel threads races on them.
+        Only direct writes are found: assignments, increments and calls to non-const methods.
+        Return one (function, variable, first write, kinds of write) per variable written by a function.
+    """
+    path_kinds = [CursorKind.UNEXPOSED_EXPR, CursorKind.PAREN_EXPR, CursorKind.MEMBER_REF_EXPR, CursorKind.ARRAY_SUBSCRIPT_EXPR]
+    scope_kinds = [CursorKind.TRANSLATION_UNIT, CursorKind.NAMESPACE, CursorKind.STRUCT_DECL, CursorKind.CLASS_DECL]
+
+    def is_first_child(parent: clang.cindex.Cursor, child: clang.cindex.Cursor) -> bool:
+        first = next(parent.get_children(), None)
+        return first is not None and first == child
+
+    def is_shared_variable(var: clang.cindex.Cursor) -> bool:
+        if var is None or var.kind != CursorKind.VAR_DECL or var.spelling == 'GImGui':
+            return False
+        if var.storage_class == StorageClass.STATIC:
+            return True
+        return var.semantic_parent is not None and var.semantic_parent.kind in scope_kinds
+
+    def write_kind(cursor_stack: list[clang.cindex.Cursor]) -> str:
+        # Walk up the expression whose base is the variable until the expression using it
+        child = cursor_stack[-1]
+        for parent in reversed(cursor_stack[:-1]):
+            if parent.kind in path_kinds and is_first_child(parent, child):
+                method = parent.referenced if parent.kind == CursorKind.MEMBER_REF_EXPR else None
+                if method is not None and method.kind == CursorKind.CXX_METHOD:
+                    return None if method.is_const_method() else 'call to {}'.format(method.spelling)
+                child = parent
+            elif parent.kind == CursorKind.COMPOUND_ASSIGNMENT_OPERATOR and is_first_child(parent, child):
+                return 'compound assignment'
+            elif parent.kind == CursorKind.BINARY_OPERATOR and is_first_child(parent, child):
+                tokens = [t.spelling for t in parent.get_tokens() if t.extent.start.offset >= child.extent.end.offset]
+                return 'assignment' if len(tokens) > 0 and tokens[0] == '=' else None
+            elif parent.kind == CursorKind.UNARY_OPERATOR:
+                tokens = [t.spelling for t in parent.get_tokens()]
+                return 'increment' if len(tokens) > 0 and (tokens[0] in ['++', '--'] or tokens[-1] in ['++', '--']) else None
+            else:
+                return None
+        return None
+
+    writes : dict[tuple[str, str], tuple[FunctionEntry, str, CodeRange, set[str]]] = dict()
+    for func in func_db.iter_definitions():
+        if not func.need_context_param or func.cursor is None:
+            continue
+
+        def write_visitor(cursor_stack: list[clang.cindex.Cursor]):
+            cursor = cursor_stack[-1]
+            if cursor.kind != CursorKind.DECL_REF_EXPR:
+                return True
+            var = cursor.referenced
+            if is_shared_variable(var):
+                kind = write_kind(cursor_stack)
+                if kind is not None:
+                    var_name = config.identity_cache.get_fully_qualified_name(var)
+                    key = (func.id, var_name)
+                    if key not in writes:
+                        writes[key] = (func, var_name, CodeRange.from_source_location(cursor.location, len(cursor.spelling)), set())
+                    writes[key][3].add(kind)
+            return False
+
+        visit_cursor(func.cursor, None, write_visitor, stack=[])
+
+    return list(writes.values())
+
+def report_thread_safety(ctx: ParsingContext, config: Config, func_db: FunctionDatabase, declarations: list[Edit]):
+    print('# Thread safety report #')
+    for edit in declarations:
+        print('`GImGui` declared thread_local at {}({})'.format(edit.path, edit.line))
+    print('NOTE: a thread_local variable cannot be exported from a DLL, build Dear ImGui statically when IMGUI_API is __declspec(dllexport)')
+
+    for code_range, function in find_context_fallbacks(ctx, config, func_db, declarations):
+        print('`GImGui` still used in {} at {}'.format(function if function is not None else 'global scope or disabled code', code_range))
+
+    writes = find_shared_writes(ctx, config, func_db)
+    writes.sort(key=lambda w: (str(w[2].file), w[2].start_line))
+    for func, var_name, code_range, kinds in writes:
+        print('WARNING: {} writes the shared variable `{}` ({}) at {}'.format(func.fq_name, var_name, ', '.join(sorted(kinds)), code_range))
+    print('{} shared variables written from functions receiving a context'.format(len(writes)))
+
+def parse_sources(config: Config, defines: list[str] = []) -> ParsingContext:
+    """
+        Parse all Dear ImGui sources as one translation unit, with each macro of `defines` defined.
+        The definitions of IM_FMTARGS, IM_FMTLIST and IM_STATIC_ASSERT are disabled in the content given
+        to libclang for imgui.h and imgui_internal.h, the files themselves are not modified.
+    """
     tmp_content = \
 '''
 #define IM_STATIC_ASSERT(...) static_assert(true)
@@ -852,41 +1684,477 @@ def generate(args, config: Config):
 #include "imgui_demo.cpp"\n
 '''
 
-    index = clang.cindex.Index.create()
-    
     # Disable annotation which generate compilation error with libclang
-    replace_in_file(config.imgui_h, [
-        ('#define IM_FMTARGS', '//TMP#define IM_FMTARGS'),
-        ('#define IM_FMTLIST', '//TMP#define IM_FMTLIST'),
-    ])
-    replace_in_file(config.imgui_internal_h, [
-        ('#define IM_STATIC_ASSERT', '//TMP#define IM_STATIC_ASSERT'),
-    ])
+    overrides = [
+        (config.imgui_h, [
+            ('#define IM_FMTARGS', '//TMP#define IM_FMTARGS'),
+            ('#define IM_FMTLIST', '//TMP#define IM_FMTLIST'),
+        ]),
+        (config.imgui_internal_h, [
+            ('#define IM_STATIC_ASSERT', '//TMP#define IM_STATIC_ASSERT'),
+        ]),
+    ]
+    unsaved_files = [(str(config.tmp), tmp_content)]
+    for path, pairs in overrides:
+        with open(path, 'r') as file:
+            filedata = file.read()
+        for p in pairs:
+            filedata = filedata.replace(p[0], p[1])
+        unsaved_files.append((str(path), filedata))
 
-    print('parse C++ sources...')
-    tu = index.parse(config.tmp, unsaved_files=[(config.tmp, tmp_content)], args=['-std=c++17'])
+    index = clang.cindex.Index.create()
+    tu = index.parse(str(config.tmp), unsaved_files=unsaved_files, args=['-std=c++17'] + ['-D' + define for define in defines])
+    # The analysis of a partial syntax tree fails far from the cause, e.g. when libclang does not find its builtin headers
+    fatal_errors = [d for d in tu.diagnostics if d.severity >= clang.cindex.Diagnostic.Fatal]
+    if len(fatal_errors) > 0:
+        for diagnostic in fatal_errors:
+            print('{}:{}: fatal error: {}'.format(diagnostic.location.file, diagnostic.location.line, diagnostic.spelling))
+        print('libclang cannot parse the sources. When a standard header is not found, set CPATH to the builtin headers of clang of the same version as libclang')
+        exit(-1)
+    return ParsingContext(tu, config)
 
-    replace_in_file(config.imgui_h, [
-        ('//TMP#define IM_FMTARGS', '#define IM_FMTARGS'),
-        ('//TMP#define IM_FMTLIST', '#define IM_FMTLIST'),
-    ])
-    replace_in_file(config.imgui_internal_h, [
-        ('//TMP#define IM_STATIC_ASSERT', '#define IM_STATIC_ASSERT'),
-    ])
+def find_missing_clang_headers() -> str:
+    """
+        Return the error raised by libclang when it does not find its builtin headers, e.g. `'float.h' file not found`
+        when its resource directory is not installed, or cannot parse the ones found, e.g. the intrinsics of gcc,
+        or None when they work. Setting CPATH to the builtin headers of clang of the same version works around it.
+    """
+    load_clang()
+    content = '#include <float.h>\n#include <stdarg.h>\n#include <stddef.h>\n#include <stdint.h>\n' \
+        '#if defined(__x86_64__) || defined(__i386__)\n#include <immintrin.h>\n#endif\n'
+    index = clang.cindex.Index.create()
+    tu = index.parse('check_headers.cpp', unsaved_files=[('check_headers.cpp', content)], args=['-std=c++17'])
+    for diagnostic in tu.diagnostics:
+        if diagnostic.severity >= clang.cindex.Diagnostic.Error:
+            return diagnostic.spelling
+    return None
 
-    ctx = ParsingContext(tu, config)
+def analyze_configuration(root_folder: str, name: str, defines: list[str], verbose=False, profile_ffi=False) -> dict:
+    """
+        Parse and analyze the sources with one configuration of DEFINE_MATRIX. It runs in a worker process of `convert --matrix`.
+        Return the functions, calls and log calls found, detached from libclang so they can be sent to the parent process,
+        and the diagnostics and output of the analysis.
+    """
+    load_clang()
+    profiler = FFIProfiler() if profile_ffi else None
+    if profiler is not None:
+        profiler.install()
+    config = Config(root_folder)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ctx = parse_sources(config, defines)
+        if profiler is not None:
+            profiler.end_phase()
+        funcs = find_function(ctx, config, verbose=verbose)
+        if profiler is not None:
+            profiler.end_phase()
+        for f in funcs:
+            f.configurations.add(name)
+        func_db = FunctionDatabase(ctx, funcs, allow_undefined=True)
+        find_function_call(ctx, config, func_db, verbose=verbose)
+
+    return {
+        'name': name,
+        'diagnostics': [str(d) for d in ctx.tu.diagnostics],
+        'output': output.getvalue(),
+        'functions': funcs,
+        'calls': [(call.caller.id, call.callee.id, call.code_range, call.call_name) for call in func_db.iter_calls()],
+        'log_calls': list(func_db.iter_log_calls()),
+        'ffi_stats': profiler.stats if profiler is not None else None,
+    }
+
+def analyze_revision(root_folder: str, revision: str) -> dict:
+    """
+        Analyze the sources of one revision checked out in `root_folder` and summarize the result. It runs in a worker process of `sweep`.
+        Nothing is modified in `root_folder`. A failure of the analysis, e.g. an assertion, is reported in the result instead of being raised.
+    """
+    load_clang()
+    config = Config(root_folder)
+    output = io.StringIO()
+    result = { 'revision': revision, 'status': 'ok', 'error': None, 'diagnostics': 0, 'functions': 0, 'calls': 0, 'edits': dict(), 'conflicts': 0 }
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            ctx = parse_sources(config)
+            result['diagnostics'] = len([d for d in ctx.tu.diagnostics if d.severity >= clang.cindex.Diagnostic.Error])
+            result['parse_time'] = time.perf_counter() - start
+            funcs = find_function(ctx, config)
+            func_db = FunctionDatabase(ctx, funcs)
+            find_function_call(ctx, config, func_db)
+            edits = plan_edits(ctx, func_db)
+        result['functions'] = len(list(func_db.iter_definitions()))
+        result['calls'] = len(list(func_db.iter_calls()))
+        for edit in edits:
+            result['edits'][edit.kind] = result['edits'].get(edit.kind, 0) + 1
+        result['conflicts'] = len(find_conflicting_edits(edits))
+        if result['conflicts'] > 0:
+            result['status'] = 'failed'
+            result['error'] = '{} conflicting edits'.format(result['conflicts'])
+    except Exception as e:
+        # Locate the failure in this script rather than in the bindings
+        frames = [(frame, line) for frame, line in traceback.walk_tb(e.__traceback__) if frame.f_code.co_filename == __file__]
+        frame, line = frames[-1] if len(frames) > 0 else list(traceback.walk_tb(e.__traceback__))[-1]
+        result['status'] = 'failed'
+        result['error'] = '{} in {} (line {}): {}'.format(type(e).__name__, getattr(frame.f_code, 'co_qualname', frame.f_code.co_name), line,
+            str(e) if str(e) != '' else linecache.getline(frame.f_code.co_filename, line).strip())
+    result['time'] = time.perf_counter() - start
+    result['output'] = output.getvalue()
+    return result
+
+def find_conflicting_edits(edits: list[Edit]) -> list[tuple[Edit, Edit]]:
+    """
+        Return the pairs of edits replacing overlapping ranges of the same line
+    """
+    edits_per_line : dict[tuple[pathlib.Path, int], list[Edit]] = dict()
+    for edit in edits:
+        edits_per_line.setdefault((edit.path, edit.line), []).append(edit)
+
+    conflicts : list[tuple[Edit, Edit]] = []
+    for line_edits in edits_per_line.values():
+        line_edits.sort(key=lambda e: e.request.start)
+        for i, edit in enumerate(line_edits):
+            for other in line_edits[i + 1:]:
+                if other.request.start >= edit.request.start + len(edit.request.before):
+                    break
+                conflicts.append((edit, other))
+    return conflicts
+
+def commit_generated(config: Config):
+    commit_message = """[generated] Convert Dear ImGui API to use an explicit ImGuiContext.
+
+This commit has been generated by the make_explicit_imgui.py script available
+in the https://github.com/Dragnalith/make_explicit_imgui/ repository.
+"""
+    result = subprocess.run(['git', 'commit', '-a', '-F', '-'], input=commit_message.encode(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=config.root_folder)
+
+    stdout = result.stdout.decode()
+    stderr = result.stderr.decode()
+    if result.returncode != 0:
+        print(stdout)
+        print(stderr)
+        print("`git commit` has failed")
+        exit(-1)
+
+class PhaseTimer:
+    """
+        Measure the wall time of each phase of a conversion and how much it raises the peak memory of the process,
+        for `convert --timings` and the budgets of `regress`. The peak memory is a high-water mark of the whole process,
+        so a phase only accounts for the memory it needs above the peak of the previous phases.
+        Peak memory is not available on Windows.
+    """
+    def __init__(self):
+        self.phases : list[dict] = []
+        self._start = time.perf_counter()
+        self._start_memory = PhaseTimer.peak_memory()
+
+    @staticmethod
+    def peak_memory() -> float:
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+    def end(self, name: str):
+        now = time.perf_counter()
+        memory = PhaseTimer.peak_memory()
+        memory_growth = memory - self._start_memory if memory is not None else None
+        self.phases.append({ 'name': name, 'time': now - self._start, 'memory_growth': memory_growth, 'peak_memory': memory })
+        self._start = now
+        self._start_memory = memory
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            json.dump({ 'phases': self.phases }, file, indent=1)
+
+class OutputCache:
+    """
+        Content-addressed cache of complete conversions. Converting the same sources with the same script and options
+        always gives the same result, e.g. when rebasing only to edit the commits following the generated one,
+        so the result is reused without parsing the sources again.
+        Each entry is a folder named after its key, holding the compressed converted files and a manifest
+        with the analysis and the reports printed by the conversion, replayed when the entry is used.
+        The least recently used entries are evicted when the cache gets bigger than `max_size` bytes.
+    """
+    VERSION = 2
+    # Seconds after which a temporary entry left by an interrupted `store` is removed
+    TEMP_MAX_AGE = 60 * 60
+
+    def __init__(self, folder: pathlib.Path, max_size: int):
+        self.folder = folder
+        self.max_size = max_size
+
+    @staticmethod
+    def default_folder() -> pathlib.Path:
+        cache_home = os.environ.get('XDG_CACHE_HOME')
+        if cache_home is None and os.name == 'nt':
+            cache_home = os.environ.get('LOCALAPPDATA')
+        base = pathlib.Path(cache_home) if cache_home else pathlib.Path.home() / '.cache'
+        return base / 'make_explicit_imgui'
+
+    @staticmethod
+    def compute_key(config: Config, options: dict) -> str:
+        """
+            Hash the script, the options, the version of libclang and the content of the converted sources.
+            imconfig.h is part of the key because it can change what the sources compile.
+        """
+        import importlib.metadata
+        try:
+            libclang_version = importlib.metadata.version('libclang')
+        except importlib.metadata.PackageNotFoundError:
+            libclang_version = None
+        key = hashlib.sha256()
+        key.update(json.dumps({ 'version': OutputCache.VERSION, 'libclang': libclang_version, 'options': options }, sort_keys=True).encode())
+        key.update(config.this_script.read_bytes())
+        for path in sorted(config.imgui_sources | set([config.imconfig_h])):
+            content = path.read_bytes() if path.exists() else b''
+            key.update('{}\0{}\0'.format(path.relative_to(config.root_folder).as_posix(), len(content) if path.exists() else -1).encode())
+            key.update(content)
+        return key.hexdigest()
+
+    def load(self, key: str) -> dict:
+        """
+            Return the converted files (relative path to content), the analysis and the reports of entry `key`, or None if it is not cached
+        """
+        import zlib
+        entry = self.folder / key
+        manifest_path = entry / 'manifest.json'
+        try:
+            manifest = json.loads(manifest_path.read_text())
+            files = { path: zlib.decompress((entry / blob).read_bytes()) for path, blob in manifest['files'].items() }
+            cached = { 'files': files, 'analysis': manifest['analysis'], 'reports': manifest['reports'] }
+        except (OSError, ValueError, KeyError, zlib.error):
+            return None
+
+        # Mark the entry as recently used
+        os.utime(manifest_path)
+        return cached
+
+    def store(self, key: str, root_folder: pathlib.Path, files: dict[pathlib.Path, bytes], analysis: dict, reports: str):
+        import zlib
+        self.folder.mkdir(parents=True, exist_ok=True)
+        # Written aside then renamed, so concurrent conversions never read a partial entry
+        tmp_entry = pathlib.Path(tempfile.mkdtemp(prefix='tmp-', dir=self.folder))
+        manifest = { 'files': dict(), 'analysis': analysis, 'reports': reports }
+        for i, (path, content) in enumerate(sorted(files.items())):
+            blob = '{}.z'.format(i)
+            (tmp_entry / blob).write_bytes(zlib.compress(content))
+            manifest['files'][path.relative_to(root_folder).as_posix()] = blob
+        (tmp_entry / 'manifest.json').write_text(json.dumps(manifest))
+        try:
+            tmp_entry.rename(self.folder / key)
+        except OSError:
+            # Already stored by another conversion
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> int:
+        """
+            Remove the least recently used entries until the cache fits in `max_size`, the most recent entry is always kept.
+            The temporary entries older than TEMP_MAX_AGE are removed as well, they are left by interrupted conversions.
+            Return the number of removed entries.
+        """
+        entries = []
+        now = time.time()
+        for entry in self.folder.iterdir():
+            manifest_path = entry / 'manifest.json'
+            if entry.is_dir() and entry.name.startswith('tmp-'):
+                try:
+                    if now - entry.stat().st_mtime > OutputCache.TEMP_MAX_AGE:
+                        shutil.rmtree(entry, ignore_errors=True)
+                except OSError:
+                    # Renamed or removed by another conversion
+                    pass
+            elif entry.is_dir() and manifest_path.exists():
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((manifest_path.stat().st_mtime, size, entry))
+        entries.sort(key=lambda e: e[0], reverse=True)
+
+        total_size = 0
+        evicted = 0
+        for i, (_, size, entry) in enumerate(entries):
+            total_size += size
+            if total_size > self.max_size and i > 0:
+                shutil.rmtree(entry, ignore_errors=True)
+                evicted += 1
+        return evicted
+
+def parse_matrix(value: str) -> list[str]:
+    """
+        Return the names of the DEFINE_MATRIX configurations selected by `--matrix`, except the default one
+    """
+    if value is None:
+        return []
+    names = list(DEFINE_MATRIX.keys()) if value == 'all' else value.split(',')
+    for name in names:
+        if name not in DEFINE_MATRIX:
+            print('Unknown configuration `{}`, available configurations are: {}'.format(name, ', '.join(DEFINE_MATRIX.keys())))
+            exit(-1)
+    return [name for name in names if name != 'default']
+
+def analyze_sources(args, config: Config, matrix: list[str], profiler: FFIProfiler, timer: PhaseTimer) -> tuple[ParsingContext, FunctionDatabase]:
+    """
+        Parse the sources, find their functions and calls, and merge the ones of the `matrix` configurations,
+        analyzed in worker processes. `args` gives the `jobs`, `verbose`, `profile_ffi` and `thread_safe` options of `convert`.
+    """
+    import concurrent.futures
+    load_clang()
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) if len(matrix) > 0 else None
+    futures = [executor.submit(analyze_configuration, str(config.root_folder), name, DEFINE_MATRIX[name], args.verbose, args.profile_ffi) for name in matrix]
+
+    if profiler is not None:
+        profiler.install()
+
+    print('parse C++ sources...')
+    ctx = parse_sources(config)
+    tu = ctx.tu
 
     if len(tu.diagnostics) > 0:
         for d in tu.diagnostics:
             print(d)
+    timer.end('parse')
+    if profiler is not None:
+        profiler.end_phase()
 
     print('Analyze syntax tree...')
     funcs = find_function(ctx, config, verbose=args.verbose)
-    func_db = FunctionDatabase(ctx, funcs)
+    for f in funcs:
+        f.configurations.add('default')
+
+    results = []
+    for future in futures:
+        result = future.result()
+        print('Merge configuration {} ({}): {} functions, {} calls, {} diagnostics'.format(
+            result['name'], ' '.join(DEFINE_MATRIX[result['name']]), len(result['functions']), len(result['calls']), len(result['diagnostics'])))
+        if args.verbose:
+            for d in result['diagnostics']:
+                print(d)
+            print(result['output'], end='')
+        funcs += result['functions']
+        if profiler is not None:
+            profiler.merge(result['ffi_stats'])
+        results.append(result)
+    if executor is not None:
+        executor.shutdown()
+    timer.end('functions')
+    if profiler is not None:
+        profiler.end_phase()
+
+    func_db = FunctionDatabase(ctx, funcs, allow_undefined=len(matrix) > 0)
+    if args.thread_safe:
+        for func in func_db.iter_definitions():
+            if func.name in THREAD_LOCAL_CONTEXT_FUNC:
+                func.implicit_contexts = []
     find_function_call(ctx, config, func_db, verbose=args.verbose)
+    for result in results:
+        for caller_id, callee_id, code_range, call_name in result['calls']:
+            func_db.add_call(caller_id, callee_id, code_range, call_name, merge=True)
+        for name, code_range, method_class in result['log_calls']:
+            func_db.add_log_call(name, code_range, method_class, merge=True)
+    for prev_call, call in func_db.conflicts:
+        print('WARNING: conflicting calls at {}: {} in one configuration, {} in another one'.format(call.code_range, prev_call.callee.fq_name, call.callee.fq_name))
+    timer.end('calls')
+    if profiler is not None:
+        profiler.end_phase()
+
+    return ctx, func_db
+
+def generate(args, config: Config) -> dict:
+    print('--------')
+    print('CONVERT SETTINGS:')
+    print('  repository path = {}'.format(config.root_folder))
+    print('  apply = {}'.format('enabled' if args.apply else 'disabled'))
+    print('  commit = {}'.format('enabled' if args.commit else 'disabled'))
+    print('  implicit api = {}'.format('enabled' if args.implicit_api else 'disabled'))
+    print('  thread safe = {}'.format('enabled' if args.thread_safe else 'disabled'))
+    print('  trace = {}'.format(args.trace if args.trace is not None else 'disabled'))
+    print('  profile ffi = {}'.format('enabled' if args.profile_ffi else 'disabled'))
+    print('  matrix = {}'.format(args.matrix if args.matrix is not None else 'disabled'))
+    print('  cache = {}'.format('disabled' if args.no_cache else (args.cache_dir if args.cache_dir is not None else OutputCache.default_folder())))
+    print('--------')
+
+    # The default configuration is analyzed in this process, the other ones in worker processes
+    matrix = parse_matrix(args.matrix)
+    analysis_options = { 'thread_safe': args.thread_safe, 'matrix': sorted(matrix) }
+    analysis_key = OutputCache.compute_key(config, analysis_options)
+
+    cache = None
+    if args.apply and not args.no_cache:
+        if args.trace is not None or args.profile_ffi:
+            print('(the output cache is not used because `--trace` and `--profile-ffi` need the analysis)')
+        else:
+            cache = OutputCache(pathlib.Path(args.cache_dir) if args.cache_dir is not None else OutputCache.default_folder(), args.cache_size * 1024 * 1024)
+            options = { 'implicit_api': args.implicit_api, 'thread_safe': args.thread_safe, 'matrix': sorted(matrix) }
+            cache_key = OutputCache.compute_key(config, options)
+            cached = cache.load(cache_key)
+            if cached is not None:
+                timer = PhaseTimer()
+                print('Conversion found in the output cache ({}), the sources are not parsed'.format(cache_key[:16]))
+                print(cached['reports'], end='')
+                for path, content in cached['files'].items():
+                    (config.root_folder / path).write_bytes(content)
+                added = [path for path in cached['files'].keys() if config.root_folder / path not in config.imgui_sources]
+                if len(added) > 0:
+                    run_git(config.root_folder, ['add', '--'] + added, check=False)
+                write_analysis_cache(config, cached['analysis'])
+                write_index_converted_key(config, OutputCache.compute_key(config, analysis_options))
+                timer.end('cache')
+                if args.commit:
+                    commit_generated(config)
+                if args.timings is not None:
+                    timer.write(args.timings)
+                print('Conversion is successful !')
+                return cached['analysis']
+
+    timer = PhaseTimer()
+    profiler = FFIProfiler() if args.profile_ffi else None
+    ctx, func_db = analyze_sources(args, config, matrix, profiler, timer)
+
+    edits = plan_edits(ctx, func_db, verbose=args.verbose)
+    tls_edits = request_thread_local_context(ctx, config) if args.thread_safe else []
+    edits += tls_edits
+    conflicts = find_conflicting_edits(edits)
+    for edit, other in conflicts:
+        print('WARNING: conflicting edits at {}({}): `{}` -> `{}` ({}, {}) and `{}` -> `{}` ({}, {})'.format(edit.path, edit.line,
+            edit.request.before, edit.request.after, edit.kind, edit.function, other.request.before, other.request.after, other.kind, other.function))
+    timer.end('plan')
+    if profiler is not None:
+        profiler.end_phase()
+    analysis = make_analysis(config, func_db, edits)
+    analysis['key'] = analysis_key
+    analysis['options'] = analysis_options
+    write_analysis_cache(config, analysis)
+    timer.end('index')
+
+    if args.trace is not None:
+        trace = TraceWriter(args.trace, config.root_folder, args.trace_categories)
+        for edit in edits:
+            trace.record(edit)
+        trace.close()
+        print('{} edits traced in {}'.format(trace.count, trace.path))
+
+    # Printed again when the conversion is restored from the output cache
+    reports = io.StringIO()
+    if args.thread_safe:
+        with contextlib.redirect_stdout(reports):
+            report_thread_safety(ctx, config, func_db, tls_edits)
+        print(reports.getvalue(), end='')
+        timer.end('thread safety')
+
+    if profiler is not None:
+        profiler.report()
+
+    if args.verbose:
+        print('Cursor identity cache: {}'.format(config.identity_cache))
 
     apis = [f for f in func_db.iter() if f.is_api and f.code_range.file == config.imgui_h and f.method_class is None]
 
+    implicit_api = None
+    if args.implicit_api:
+        implicit_api = generate_implicit_api(ctx, config, apis, thread_safe=args.thread_safe)
+        edits.append(request_include_implicit_api(ctx, config))
+        timer.end('implicit api')
+
     methods = [f for f in func_db.iter_definitions() if f.need_context_param and f.method_class is not None]
     methods.sort(key= lambda f: f.method_class)
     classes = set([f.method_class for f in methods])
@@ -899,29 +2167,907 @@ def generate(args, config: Config):
                 print(' -> ' + m.fq_name)
 
     if args.apply:
+        if len(conflicts) > 0:
+            print('{} conflicting edits, the conversion cannot be applied'.format(len(conflicts)))
+            exit(-1)
+
         print('Apply conversion...')
         ctx.transform_sources()
 
-        if args.commit:
-            commit_message = """[generated] Convert Dear ImGui API to use an explicit ImGuiContext.
+        if implicit_api is not None:
+            for path, content in implicit_api.items():
+                with open(path, 'w') as file:
+                    file.write(content)
+            run_git(config.root_folder, ['add', '--'] + [str(path) for path in implicit_api.keys()], check=False)
+        write_index_converted_key(config, OutputCache.compute_key(config, analysis_options))
+        timer.end('apply')
 
-This commit has been generated by the make_explicit_imgui.py script available
-in the https://github.com/Dragnalith/make_explicit_imgui/ repository.
-"""
-            result = subprocess.run(['git', 'commit', '-a', '-F', '-'], input=commit_message.encode(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=config.root_folder)
+        if cache is not None:
+            outputs = sorted(config.imgui_sources) + (list(implicit_api.keys()) if implicit_api is not None else [])
+            cache.store(cache_key, config.root_folder, { path: path.read_bytes() for path in outputs if path.exists() }, analysis, reports.getvalue())
 
-            stdout = result.stdout.decode()
-            stderr = result.stderr.decode()
-            if result.returncode != 0:
-                print(stdout)
-                print(stderr)
-                print("`git commit` has failed")
-                exit(-1)
+        if args.commit:
+            commit_generated(config)
 
+        if args.timings is not None:
+            timer.write(args.timings)
         print('Conversion is successful !')
     else:
+        if args.timings is not None:
+            timer.write(args.timings)
         print('Parsing and analysis are successful')
         print('(conversion is not applied because the `apply` option is disabled)')
+    return analysis
+
+def run_git(root_folder: pathlib.Path, git_args: list[str], check=True) -> str:
+    result = subprocess.run(['git'] + git_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=root_folder)
+    if result.returncode != 0:
+        if not check:
+            return None
+        print(result.stderr.decode())
+        print("`git {}` has failed".format(' '.join(git_args)))
+        exit(-1)
+    return result.stdout.decode(errors='replace')
+
+def parse_diff_hunks(diff_text: str) -> dict[str, list[tuple[int, int, int, int]]]:
+    """
+        Parse the output of `git diff -U0` and return, for each file, the list of hunks
+        as (old_start, old_count, new_start, new_count) tuples. Files are keyed by their old path.
+    """
+    hunks : dict[str, list[tuple[int, int, int, int]]] = dict()
+    current = None
+    # Lines of the current hunk not read yet, a removed line such as `-- comment` must not be read as a file header
+    old_remaining = 0
+    new_remaining = 0
+    for line in diff_text.splitlines():
+        if old_remaining > 0 or new_remaining > 0:
+            if line.startswith('-'):
+                old_remaining -= 1
+            elif line.startswith('+'):
+                new_remaining -= 1
+            elif line.startswith(' '):
+                old_remaining -= 1
+                new_remaining -= 1
+            continue
+        if line.startswith('--- '):
+            path = line[4:]
+            current = path[2:] if path.startswith('a/') else path
+        elif line.startswith('+++ ') and current == '/dev/null':
+            path = line[4:]
+            current = path[2:] if path.startswith('b/') else path
+        elif line.startswith('@@ ') and current is not None:
+            old, new = line.split(' ')[1:3]
+            def parse_range(text):
+                items = text[1:].split(',')
+                return int(items[0]), int(items[1]) if len(items) > 1 else 1
+            old_start, old_count = parse_range(old)
+            new_start, new_count = parse_range(new)
+            hunks.setdefault(current, []).append((old_start, old_count, new_start, new_count))
+            old_remaining = old_count
+            new_remaining = new_count
+    return hunks
+
+def hunk_lines(hunk: tuple[int, int, int, int]) -> range:
+    """
+        Old-side lines touched by a hunk. A pure insertion touches the lines around the insertion point.
+    """
+    old_start, old_count, _, _ = hunk
+    if old_count == 0:
+        return range(old_start, old_start + 2)
+    return range(old_start, old_start + old_count)
+
+class LineMap:
+    """
+        Map line numbers of a file from one revision to another using the hunks of `git diff -U0`.
+        Lines rewritten in place (hunks with as many old lines as new ones) keep their position,
+        which is the case of every line modified by the conversion. Other modified lines map to None.
+    """
+    def __init__(self, hunks: list[tuple[int, int, int, int]]):
+        self._hunks = sorted(hunks or [])
+
+    def map(self, line: int) -> int:
+        offset = 0
+        for old_start, old_count, new_start, new_count in self._hunks:
+            if old_count == 0:
+                # Insertion after `old_start`
+                if line <= old_start:
+                    break
+            else:
+                if line < old_start:
+                    break
+                if line < old_start + old_count:
+                    return new_start + line - old_start if old_count == new_count else None
+            offset += new_count - old_count
+        return line + offset
+
+def analysis_cache_folder(config: Config) -> pathlib.Path:
+    git_dir = run_git(config.root_folder, ['rev-parse', '--git-dir'], check=False)
+    if git_dir is None:
+        return None
+    return (config.root_folder / git_dir.strip()).resolve() / 'make_explicit_imgui'
+
+def make_analysis(config: Config, func_db: FunctionDatabase, edits: list[Edit]) -> dict:
+    """
+        Summarize the functions, calls and edits of the analysis with paths relative to the repository
+    """
+    def relative(path: pathlib.Path) -> str:
+        return path.relative_to(config.root_folder).as_posix()
+
+    return {
+        'functions': [
+            {
+                'id': f.id, 'name': f.fq_name, 'short_name': f.name, 'definition': f.is_definition, 'method_class': f.method_class, 'is_api': f.is_api,
+                'file': relative(f.code_range.file), 'start_line': f.code_range.start_line, 'start_column': f.code_range.start_column, 'end_line': f.end_line,
+                'return_type': f.return_type, 'params': [{ 'name': p.name, 'type': p.type, 'declaration': p.declaration } for p in f.params],
+                'variadic': f.is_variadic, 'fmtargs': f.fmtargs, 'fmtlist': f.fmtlist,
+                'need_context': f.need_context_param, 'configurations': sorted(f.configurations),
+                'implicit_contexts': [[relative(c.file), c.start_line, c.start_column, c.end_column] for c in f.implicit_contexts],
+            }
+            for f in func_db.iter()
+        ],
+        'calls': [
+            {
+                'caller': call.caller.fq_name, 'callee': call.callee.fq_name, 'caller_id': call.caller.id, 'callee_id': call.callee.id,
+                'file': relative(call.code_range.file), 'line': call.code_range.start_line, 'column': call.code_range.start_column, 'has_arg': call.has_arg,
+            }
+            for call in func_db.iter_calls()
+        ],
+        'edits': [
+            {
+                'kind': edit.kind, 'function': edit.function, 'file': relative(edit.path), 'line': edit.line,
+                'column': edit.request.start + 1, 'before': edit.request.before, 'after': edit.request.after,
+            }
+            for edit in edits
+        ],
+    }
+
+def write_analysis_cache(config: Config, analysis: dict, kept_count = 8):
+    """
+        Save the analysis of the commit currently checked out so `preflight` can predict
+        the lines touched by a regeneration without parsing again, and index it for `query`.
+    """
+    folder = analysis_cache_folder(config)
+    source = run_git(config.root_folder, ['rev-parse', 'HEAD'], check=False)
+    if folder is None or source is None:
+        return
+    source = source.strip()
+    analysis = dict(analysis, source=source)
+
+    folder.mkdir(parents=True, exist_ok=True)
+    with open(folder / 'analysis-{}.json'.format(source), 'w') as file:
+        json.dump(analysis, file)
+
+    caches = sorted(folder.glob('analysis-*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old_cache in caches[kept_count:]:
+        old_cache.unlink()
+
+    write_index(folder / 'index.sqlite', analysis)
+
+def load_analysis_cache(config: Config, source: str) -> dict:
+    """
+        Return the cached analysis of `source`, or None if `source` has never been analyzed.
+        The analysis of another commit is never returned: its edits and calls would not match the lines of `source`.
+    """
+    folder = analysis_cache_folder(config)
+    if folder is None or not folder.exists():
+        return None
+    path = folder / 'analysis-{}.json'.format(source)
+    if not path.exists():
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+INDEX_SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE functions (id TEXT, name TEXT, short_name TEXT, definition INTEGER, method_class TEXT, is_api INTEGER,
+    file TEXT, start_line INTEGER, start_column INTEGER, end_line INTEGER, return_type TEXT, params TEXT,
+    variadic INTEGER, fmtargs INTEGER, fmtlist INTEGER, need_context INTEGER, configurations TEXT);
+CREATE TABLE implicit_contexts (function_id TEXT, file TEXT, line INTEGER, start_column INTEGER, end_column INTEGER);
+CREATE TABLE calls (caller_id TEXT, callee_id TEXT, caller TEXT, callee TEXT, file TEXT, line INTEGER, column INTEGER, has_arg INTEGER);
+CREATE TABLE edits (kind TEXT, function TEXT, file TEXT, line INTEGER, column INTEGER, before TEXT, after TEXT);
+CREATE INDEX functions_id ON functions (id);
+CREATE INDEX functions_name ON functions (name);
+CREATE INDEX functions_short_name ON functions (short_name);
+CREATE INDEX functions_file ON functions (file, start_line);
+CREATE INDEX implicit_contexts_function ON implicit_contexts (function_id);
+CREATE INDEX calls_caller ON calls (caller_id);
+CREATE INDEX calls_callee ON calls (callee_id);
+CREATE INDEX calls_file ON calls (file, line);
+CREATE INDEX edits_function ON edits (function);
+CREATE INDEX edits_file ON edits (file, line);
+'''
+
+def write_index(path: pathlib.Path, analysis: dict):
+    """
+        Write the analysis in a SQLite database queried by `query`.
+        The database is built aside and then replaces the previous one, so a query never sees a partial index.
+    """
+    import sqlite3
+    temp_path = path.with_name(path.name + '.tmp')
+    if temp_path.exists():
+        temp_path.unlink()
+    db = sqlite3.connect(str(temp_path))
+    db.executescript(INDEX_SCHEMA)
+    db.executemany('INSERT INTO meta VALUES (?, ?)', [('source', analysis['source']), ('created', str(time.time())),
+        ('key', analysis.get('key')), ('options', json.dumps(analysis.get('options'), sort_keys=True))])
+    db.executemany('INSERT INTO functions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+        (f['id'], f['name'], f['short_name'], f['definition'], f['method_class'], f['is_api'],
+            f['file'], f['start_line'], f['start_column'], f['end_line'], f['return_type'], json.dumps(f['params']),
+            f['variadic'], f['fmtargs'], f['fmtlist'], f['need_context'], ','.join(f['configurations']))
+        for f in analysis['functions']
+    ])
+    db.executemany('INSERT INTO implicit_contexts VALUES (?, ?, ?, ?, ?)', [
+        (f['id'], file, line, start_column, end_column)
+        for f in analysis['functions'] if f['definition'] for file, line, start_column, end_column in f['implicit_contexts']
+    ])
+    db.executemany('INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [
+        (c['caller_id'], c['callee_id'], c['caller'], c['callee'], c['file'], c['line'], c['column'], c['has_arg'])
+        for c in analysis['calls']
+    ])
+    db.executemany('INSERT INTO edits VALUES (?, ?, ?, ?, ?, ?, ?)', [
+        (e['kind'], e['function'], e['file'], e['line'], e['column'], e['before'], e['after'])
+        for e in analysis['edits']
+    ])
+    db.commit()
+    db.close()
+    os.replace(temp_path, path)
+
+def write_index_converted_key(config: Config, converted_key: str):
+    """
+        Record in the index the key of the sources converted from its analysis, so `api` still finds it on the converted tree
+    """
+    import sqlite3
+    folder = analysis_cache_folder(config)
+    if folder is None or not (folder / 'index.sqlite').exists():
+        return
+    db = sqlite3.connect(str(folder / 'index.sqlite'))
+    db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('converted_key', converted_key))
+    db.commit()
+    db.close()
+
+def open_index(config: Config) -> sqlite3.Connection:
+    """
+        Open the index written by the last `convert` in read only mode, or return None if there is none
+    """
+    import sqlite3
+    folder = analysis_cache_folder(config)
+    if folder is None or not (folder / 'index.sqlite').exists():
+        return None
+    db = sqlite3.connect('file:{}?mode=ro'.format((folder / 'index.sqlite').as_posix()), uri=True)
+    db.row_factory = sqlite3.Row
+    return db
+
+def query(args, config: Config):
+    """
+        Answer questions about the last analysis from its index, without parsing nor loading libclang:
+        - `why <function>`: the chain of calls from the function to a use of `GImGui` making it need a context
+        - `callers <function>` and `callees <function>`: the calls to and from the function
+        - `edits [<function>]`: the planned edits made on behalf of the function
+        `--file` restricts the call sites and the edits to one file.
+    """
+    db = open_index(config)
+    if db is None:
+        print('No index found, run `convert` on {} first'.format(config.root_folder))
+        exit(-1)
+
+    source = db.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()['value']
+    head = run_git(config.root_folder, ['rev-parse', 'HEAD', 'HEAD^'], check=False)
+    if head is not None and source not in head.split():
+        print('WARNING: the index comes from the analysis of {}, run `convert` to update it'.format(source))
+
+    file = pathlib.PurePath(args.file).as_posix() if args.file is not None else None
+    if file is not None and pathlib.Path(args.file).resolve().is_relative_to(config.root_folder):
+        file = pathlib.Path(args.file).resolve().relative_to(config.root_folder).as_posix()
+
+    def find_functions(name: str) -> list[sqlite3.Row]:
+        rows = db.execute('SELECT * FROM functions WHERE definition = 1 AND (name = ? OR short_name = ?) ORDER BY file, start_line', (name, name)).fetchall()
+        if len(rows) == 0:
+            # Partially qualified name, e.g. `ImGuiWindow::GetID` of a function nested in a namespace
+            rows = db.execute("SELECT * FROM functions WHERE definition = 1 AND substr(name, -length(?) - 2) = '::' || ? ORDER BY file, start_line", (name, name)).fetchall()
+        return rows
+
+    def describe(f: sqlite3.Row) -> str:
+        return '{}({})'.format(f['name'], ', '.join(p['declaration'] for p in json.loads(f['params'])))
+
+    if args.question in ['why', 'callers', 'callees'] or args.name is not None:
+        if args.name is None:
+            print('`{}` requires a function name'.format(args.question))
+            exit(-1)
+        functions = find_functions(args.name)
+        if len(functions) == 0:
+            print('No function named `{}` in the index'.format(args.name))
+            exit(-1)
+
+    if args.question == 'why':
+        for f in functions:
+            if not f['need_context']:
+                if f['method_class'] in CLASS_WITH_CONTEXT:
+                    print('{} does not need a context parameter, {} holds its context in `Ctx`'.format(describe(f), f['method_class']))
+                else:
+                    print('{} does not need a context'.format(describe(f)))
+                continue
+
+            # Shortest chain of calls to functions needing a context, up to one using `GImGui` itself
+            parents = { f['id']: None }
+            pending = collections.deque([f['id']])
+            found = None
+            while len(pending) > 0 and found is None:
+                id = pending.popleft()
+                uses = db.execute('SELECT file, line FROM implicit_contexts WHERE function_id = ? ORDER BY file, line', (id,)).fetchall()
+                if len(uses) > 0:
+                    found = (id, uses)
+                    break
+                for call in db.execute('SELECT DISTINCT calls.callee_id, calls.file, calls.line FROM calls JOIN functions ON functions.id = calls.callee_id '
+                                       'WHERE calls.caller_id = ? AND functions.definition = 1 AND functions.need_context = 1 ORDER BY calls.file, calls.line', (id,)):
+                    if call['callee_id'] not in parents:
+                        parents[call['callee_id']] = (id, call['file'], call['line'])
+                        pending.append(call['callee_id'])
+
+            print('{} needs a context:'.format(describe(f)))
+            if found is None:
+                print('  no chain of calls to a use of `GImGui` found in the index')
+                continue
+            chain = []
+            id = found[0]
+            while parents[id] is not None:
+                caller_id, call_file, call_line = parents[id]
+                chain.append((caller_id, id, call_file, call_line))
+                id = caller_id
+            def name_of(id):
+                return db.execute('SELECT name FROM functions WHERE id = ?', (id,)).fetchone()['name']
+            for caller_id, callee_id, call_file, call_line in reversed(chain):
+                print('  {} calls {} at {}:{}'.format(name_of(caller_id), name_of(callee_id), call_file, call_line))
+            uses = found[1]
+            print('  {} uses GImGui at {}{}'.format(name_of(found[0]), ', '.join('{}:{}'.format(u['file'], u['line']) for u in uses[:3]),
+                ' and {} more places'.format(len(uses) - 3) if len(uses) > 3 else ''))
+
+    elif args.question in ['callers', 'callees']:
+        this_side, other_side = ('callee', 'caller') if args.question == 'callers' else ('caller', 'callee')
+        for f in functions:
+            calls = db.execute('SELECT DISTINCT calls.{other} AS name, calls.file, calls.line, functions.need_context FROM calls '
+                               'JOIN functions ON functions.id = calls.{other}_id AND functions.definition = 1 '
+                               'WHERE calls.{this}_id = ? AND (? IS NULL OR calls.file = ?) ORDER BY calls.file, calls.line'.format(this=this_side, other=other_side),
+                               (f['id'], file, file)).fetchall()
+            print('{} has {} {}:'.format(describe(f), len(calls), args.question))
+            for call in calls:
+                print('  {}:{}  {}{}'.format(call['file'], call['line'], call['name'], ' (needs a context)' if call['need_context'] else ''))
+
+    elif args.question == 'edits':
+        conditions = ['1']
+        values = []
+        if file is not None:
+            conditions.append('file = ?')
+            values.append(file)
+        if args.name is not None:
+            names = set(f['name'] for f in functions)
+            conditions.append('function IN ({})'.format(', '.join('?' * len(names))))
+            values += sorted(names)
+        edits = db.execute('SELECT * FROM edits WHERE {} ORDER BY file, line, column'.format(' AND '.join(conditions)), values).fetchall()
+        for e in edits:
+            print('{}:{}:{}  {:<8}{}  `{}` -> `{}`'.format(e['file'], e['line'], e['column'], e['kind'], e['function'], e['before'], e['after']))
+        print('{} edits'.format(len(edits)))
+
+def load_index_analysis(config: Config, key: str) -> dict:
+    """
+        Return the functions of the index in the format of `make_analysis`, if the index was written
+        by an analysis of the current sources with the same options, i.e. its key is `key`, or if the current sources
+        are the result of the conversion made from that analysis. Otherwise return None.
+    """
+    db = open_index(config)
+    if db is None:
+        return None
+    meta = { row['key']: row['value'] for row in db.execute('SELECT key, value FROM meta') }
+    if key not in [meta.get('key'), meta.get('converted_key')]:
+        return None
+    functions = []
+    for row in db.execute('SELECT * FROM functions ORDER BY file, start_line, start_column'):
+        f = dict(row)
+        for flag in ['definition', 'is_api', 'variadic', 'need_context']:
+            f[flag] = bool(f[flag])
+        f['params'] = json.loads(f['params'])
+        f['configurations'] = f['configurations'].split(',') if f['configurations'] != '' else []
+        functions.append(f)
+    return { 'source': meta['source'], 'key': meta['key'], 'converted': key != meta['key'], 'options': json.loads(meta['options']), 'functions': functions }
+
+def api(args, config: Config):
+    """
+        Write the explicit context API of the sources as JSON and as a header stub.
+        Only the declarations are used, read from the index of the last `convert` when it analyzed the same sources
+        with the same options, or converted them into the current ones, so the sources are parsed only when they have changed.
+        Otherwise the sources are analyzed without planning the edits nor writing the index, they must then use the
+        implicit context API, e.g. a checkout of upstream Dear ImGui.
+    """
+    to_stdout = args.json is None and args.header is None
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        matrix = parse_matrix(args.matrix)
+        key = OutputCache.compute_key(config, { 'thread_safe': args.thread_safe, 'matrix': sorted(matrix) })
+        analysis = load_index_analysis(config, key) if not args.no_index else None
+        if analysis is not None:
+            print('Use the index of the analysis of {}{}'.format(analysis['source'], ', converted into the current sources' if analysis['converted'] else ''))
+        else:
+            # Converted sources have no `GImGui` left, their analysis would find no function needing a context
+            if re.search(r'\bNewFrame\(\s*ImGuiContext\s*\*', config.imgui_h.read_text()) is not None:
+                print('{} already uses the explicit context API and the index of its conversion is not found, run `api` on the sources before the conversion'.format(config.imgui_h))
+                exit(-1)
+            print('No index of the current sources, analyze them...')
+            analysis_args = argparse.Namespace(verbose=False, jobs=args.jobs, profile_ffi=False, thread_safe=args.thread_safe)
+            _, func_db = analyze_sources(analysis_args, config, matrix, None, PhaseTimer())
+            func_db.compute_context_need()
+            analysis = make_analysis(config, func_db, [])
+            analysis['options'] = { 'thread_safe': args.thread_safe, 'matrix': sorted(matrix) }
+            source = run_git(config.root_folder, ['rev-parse', 'HEAD'], check=False)
+            analysis['source'] = source.strip() if source is not None else None
+
+    headers = ['imgui.h'] + (['imgui_internal.h'] if args.internal else [])
+    imgui_h = config.imgui_h.read_text()
+    version = re.search(r'#define\s+IMGUI_VERSION\s+"([^"]+)"', imgui_h)
+
+    declarations = sorted([f for f in analysis['functions'] if f['file'] in headers], key=lambda f: (f['file'], f['start_line'], f['start_column']))
+    functions = []
+    for f in declarations:
+        if not f['is_api']:
+            continue
+        params = [FunctionParameter(p['name'], p['type'], p['declaration']) for p in f['params']]
+        fmtargs = f['fmtargs']
+        fmtlist = f['fmtlist']
+        has_context = f['need_context'] and not any('ImGuiContext' in p.declaration for p in params)
+        if has_context:
+            params = [FunctionParameter('ctx', 'ImGuiContext *', 'ImGuiContext* ctx')] + params
+            fmtargs = fmtargs + 1 if fmtargs > 0 else 0
+            fmtlist = fmtlist + 1 if fmtlist > 0 else 0
+        namespace = None
+        if f['method_class'] is None and f['name'] != f['short_name']:
+            namespace = f['name'][:-len(f['short_name']) - 2]
+        functions.append({
+            'name': f['short_name'],
+            'qualified_name': f['name'],
+            'namespace': namespace,
+            'class': f['method_class'],
+            'file': f['file'],
+            'line': f['start_line'],
+            'return_type': f['return_type'],
+            'params': [
+                { 'name': p.name, 'type': p.type, 'default': p.declaration[p.declaration.find('=') + 1:].strip() if '=' in p.declaration else None }
+                for p in params
+            ],
+            'variadic': f['variadic'],
+            'fmtargs': fmtargs,
+            'fmtlist': fmtlist,
+            'need_context': f['need_context'],
+            'context_param': has_context,
+            'configurations': f['configurations'],
+            'prototype': format_prototype(f['return_type'], f['short_name'], params, fmtargs, fmtlist),
+        })
+
+    # Classes whose methods need a context, all the methods of the headers are listed, not only the API ones
+    classes : dict[str, list[str]] = dict()
+    for f in declarations:
+        if f['need_context'] and f['method_class'] is not None:
+            classes.setdefault(f['method_class'], [])
+            if f['name'] not in classes[f['method_class']]:
+                classes[f['method_class']].append(f['name'])
+
+    surface = {
+        'version': version.group(1) if version is not None else None,
+        'source': analysis['source'],
+        'options': dict(sorted(analysis['options'].items())),
+        'functions': functions,
+        'classes': { name: sorted(methods) for name, methods in sorted(classes.items()) },
+    }
+    if args.json is not None or to_stdout:
+        text = json.dumps(surface, indent=1) + '\n'
+        if to_stdout:
+            sys.stdout.write(text)
+        else:
+            pathlib.Path(args.json).write_text(text)
+            print('{} functions written in {}'.format(len(functions), args.json))
+
+    if args.header is not None:
+        lines = [
+            '// Explicit context API of Dear ImGui {}, generated by make_explicit_imgui.py'.format(surface['version']),
+            '// Declarations only, the types are the ones of {}'.format(', '.join(headers)),
+            '',
+            '#pragma once',
+            '',
+            'struct ImGuiContext;',
+        ]
+        scopes : dict[tuple[str, str], list[dict]] = dict()
+        for f in functions:
+            scope = ('struct', f['class']) if f['class'] is not None else ('namespace', f['namespace'])
+            scopes.setdefault(scope, []).append(f)
+        for (kind, name), scope_functions in scopes.items():
+            lines.append('')
+            indent = ''
+            if name is not None:
+                lines += ['{} {}'.format(kind, name), '{']
+                indent = '    '
+            lines += [indent + f['prototype'] for f in scope_functions]
+            if name is not None:
+                lines.append('};' if kind == 'struct' else '}')
+        pathlib.Path(args.header).write_text('\n'.join(lines) + '\n')
+        print('{} functions written in {}'.format(len(functions), args.header))
+
+def preflight(args, config: Config):
+    """
+        Predict which pre-generation and post-generation commits will conflict during `rebase`.
+
+        Pre-generation commits are checked against the upstream changes between `base` and `onto`.
+        Post-generation commits are also checked against the lines the regeneration will touch: the upstream
+        changes themselves, plus every edit and call site belonging to a function whose body changed upstream,
+        because the context need of those functions may change. Those lines come from the cached analysis
+        written by the last `convert`, no parsing is done.
+    """
+    root = config.root_folder
+    onto = args.onto if args.onto is not None else args.base
+
+    print('--------')
+    print('PREFLIGHT SETTINGS:')
+    print('  repository path = {}'.format(root))
+    print('  branch = {}'.format(args.branch))
+    print('  base = {}'.format(args.base))
+    print('  onto = {}'.format(onto))
+    print('--------')
+
+    commits = []
+    for line in run_git(root, ['log', '--reverse', '--format=%H %s', '{}..{}'.format(args.base, args.branch)]).splitlines():
+        sha, subject = line.split(' ', 1)
+        commits.append((sha, subject))
+
+    generated_index = next((i for i, (_, subject) in enumerate(commits) if subject.startswith('[generated]')), None)
+    if generated_index is None:
+        print('No `[generated]` commit found between {} and {}'.format(args.base, args.branch))
+        exit(-1)
+
+    generated = commits[generated_index][0]
+    source = run_git(root, ['rev-parse', generated + '^']).strip()
+    analysis = load_analysis_cache(config, source)
+    if analysis is None:
+        print('No cached analysis of {}, the parent of the generated commit, run `convert` on it first'.format(source))
+        exit(-1)
+
+    upstream_hunks = parse_diff_hunks(run_git(root, ['diff', '-U0', args.base, onto]))
+    upstream_lines : dict[str, set[int]] = dict()
+    for path, hunks in upstream_hunks.items():
+        upstream_lines[path] = set()
+        for hunk in hunks:
+            upstream_lines[path].update(hunk_lines(hunk))
+    print('upstream: {} files changed between {} and {}'.format(len(upstream_lines), args.base, onto))
+
+    # Functions whose body changed upstream, expressed in the coordinates of the analyzed source
+    source_maps = parse_diff_hunks(run_git(root, ['diff', '-U0', args.base, analysis['source'], '--'] + list(upstream_lines.keys()))) if len(upstream_lines) > 0 else dict()
+    changed_source_lines : dict[str, set[int]] = dict()
+    for path, lines in upstream_lines.items():
+        line_map = LineMap(source_maps.get(path))
+        changed_source_lines[path] = set(l for l in map(line_map.map, lines) if l is not None)
+
+    changed_functions = set()
+    for f in analysis['functions']:
+        if not f['definition']:
+            continue
+        lines = changed_source_lines.get(f['file'])
+        if lines is not None and any(f['start_line'] <= l <= f['end_line'] for l in lines):
+            changed_functions.add(f['name'])
+
+    regenerated_lines : dict[str, dict[int, str]] = dict()
+    for edit in analysis['edits']:
+        if edit['function'] in changed_functions:
+            regenerated_lines.setdefault(edit['file'], dict())[edit['line']] = 'edit in {}'.format(edit['function'])
+    for call in analysis['calls']:
+        if call['callee'] in changed_functions:
+            regenerated_lines.setdefault(call['file'], dict())[call['line']] = 'call to {}'.format(call['callee'])
+    print('regeneration: {} functions changed upstream, {} generated lines may change'.format(len(changed_functions), sum(len(l) for l in regenerated_lines.values())))
+    for name in sorted(changed_functions):
+        print('  {}'.format(name))
+
+    conflicts = 0
+    print('--------')
+    for index, (sha, subject) in enumerate(commits):
+        if index == generated_index:
+            continue
+
+        commit_hunks = parse_diff_hunks(run_git(root, ['diff', '-U0', sha + '^', sha]))
+        if len(commit_hunks) == 0:
+            continue
+        files = list(commit_hunks.keys())
+        to_parent = parse_diff_hunks(run_git(root, ['diff', '-U0', args.base, sha + '^', '--'] + files))
+        from_source = parse_diff_hunks(run_git(root, ['diff', '-U0', analysis['source'], sha + '^', '--'] + files)) if index > generated_index else dict()
+
+        reasons = []
+        for path, hunks in commit_hunks.items():
+            touched : dict[int, str] = dict()
+            line_map = LineMap(to_parent.get(path))
+            for l in upstream_lines.get(path, set()):
+                mapped = line_map.map(l)
+                if mapped is not None:
+                    touched[mapped] = 'upstream change'
+            if index > generated_index:
+                line_map = LineMap(from_source.get(path))
+                for l, reason in regenerated_lines.get(path, dict()).items():
+                    mapped = line_map.map(l)
+                    if mapped is not None:
+                        touched.setdefault(mapped, reason)
+
+            for hunk in hunks:
+                lines = hunk_lines(hunk)
+                # Changes on adjacent lines conflict too
+                hits = [touched[l] for l in range(lines.start - 1, lines.stop + 1) if l in touched]
+                if len(hits) > 0:
+                    reasons.append('{}:{}-{} overlaps {}'.format(path, lines.start, lines.stop - 1, hits[0]))
+
+        if len(reasons) > 0:
+            conflicts += 1
+            print('{} {} {}'.format('pre ' if index < generated_index else 'post', sha[:10], subject))
+            for reason in reasons:
+                print('    {}'.format(reason))
+
+    if conflicts == 0:
+        print('No likely conflict found')
+    else:
+        print('{} commits are likely to conflict'.format(conflicts))
+
+def sweep(args, config: Config):
+    """
+        Analyze every revision of a commit range, oldest first, and report the first one breaking the conversion.
+        Each revision is analyzed in a worker process, from a tree made of the root files of that revision.
+        Blobs are extracted once and hard linked in the trees of the revisions sharing them, revisions with the same
+        sources share one analysis, and the results are cached per sources so widening the range only analyzes new sources.
+    """
+    import concurrent.futures
+    root = config.root_folder
+    cache_folder = analysis_cache_folder(config)
+    if cache_folder is None:
+        print('{} is not a git repository'.format(root))
+        exit(-1)
+    cache_folder = cache_folder / 'sweep'
+
+    print('--------')
+    print('SWEEP SETTINGS:')
+    print('  repository path = {}'.format(root))
+    print('  range = {}'.format(args.range))
+    print('  jobs = {}'.format(args.jobs if args.jobs is not None else os.cpu_count()))
+    print('  cache = {}'.format('disabled' if args.no_cache else cache_folder))
+    print('--------')
+
+    revisions = []
+    for line in run_git(root, ['log', '--reverse', '--format=%H %s', args.range]).splitlines():
+        sha, subject = line.split(' ', 1) if ' ' in line else (line, '')
+        revisions.append((sha, subject))
+    if len(revisions) == 0:
+        print('No commit in {}'.format(args.range))
+        exit(-1)
+
+    # Revisions are grouped by the blobs of their root files, which are the only ones parsed
+    script_hash = hashlib.sha256(config.this_script.read_bytes()).hexdigest()
+    groups : dict[str, list[str]] = dict()
+    group_files : dict[str, list[tuple[str, str]]] = dict()
+    revision_group : dict[str, str] = dict()
+    for sha, _ in revisions:
+        files = []
+        for line in run_git(root, ['ls-tree', sha]).splitlines():
+            info, name = line.split('\t', 1)
+            _, kind, blob = info.split(' ')
+            if kind == 'blob':
+                files.append((name, blob))
+        key = hashlib.sha256((script_hash + ''.join('{} {}\n'.format(name, blob) for name, blob in sorted(files))).encode()).hexdigest()
+        groups.setdefault(key, []).append(sha)
+        group_files[key] = files
+        revision_group[sha] = key
+
+    results : dict[str, dict] = dict()
+    if not args.no_cache:
+        for key in groups.keys():
+            path = cache_folder / '{}.json'.format(key)
+            if path.exists():
+                with open(path) as file:
+                    results[key] = json.load(file)
+    pending = [key for key in groups.keys() if key not in results]
+    print('{} revisions, {} distinct sources, {} to analyze'.format(len(revisions), len(groups), len(pending)))
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='make_explicit_imgui_sweep_') as work_folder:
+        work_folder = pathlib.Path(work_folder)
+        blob_folder = work_folder / 'blobs'
+        blob_folder.mkdir()
+        blobs = sorted(set(blob for key in pending for _, blob in group_files[key]))
+        if len(blobs) > 0:
+            result = subprocess.run(['git', 'cat-file', '--batch'], input=''.join(blob + '\n' for blob in blobs).encode(), stdout=subprocess.PIPE, cwd=root, check=True)
+            offset = 0
+            for blob in blobs:
+                header_end = result.stdout.index(b'\n', offset)
+                size = int(result.stdout[offset:header_end].split(b' ')[2])
+                (blob_folder / blob).write_bytes(result.stdout[header_end + 1:header_end + 1 + size])
+                offset = header_end + 1 + size + 1
+
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs)
+        try:
+            futures = dict()
+            for key in pending:
+                tree = work_folder / key[:16]
+                tree.mkdir()
+                for name, blob in group_files[key]:
+                    try:
+                        os.link(blob_folder / blob, tree / name)
+                    except OSError:
+                        shutil.copyfile(blob_folder / blob, tree / name)
+                futures[executor.submit(analyze_revision, str(tree), groups[key][0])] = key
+
+            for future in concurrent.futures.as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker did not return, e.g. BrokenProcessPool when it crashed in libclang.
+                    # The failure may not come from the sources, so it is not cached.
+                    result = { 'revision': groups[key][0], 'status': 'failed', 'error': '{}: {}'.format(type(e).__name__, e), 'diagnostics': 0,
+                        'functions': 0, 'calls': 0, 'edits': dict(), 'conflicts': 0, 'time': 0.0, 'output': '' }
+                    results[key] = result
+                    print('failed to analyze {}: {}'.format(result['revision'][:10], result['error']))
+                    continue
+                print('analyzed {} in {:.1f}s: {}'.format(result['revision'][:10], result['time'], result['status'] if result['error'] is None else result['error']))
+                if args.verbose:
+                    print(result['output'], end='')
+                results[key] = result
+                if not args.no_cache:
+                    cache_folder.mkdir(parents=True, exist_ok=True)
+                    with open(cache_folder / '{}.json'.format(key), 'w') as file:
+                        json.dump(result, file)
+                shutil.rmtree(work_folder / key[:16], ignore_errors=True)
+        finally:
+            # The analyses not started yet are cancelled when the sweep is interrupted
+            executor.shutdown(cancel_futures=True)
+    print('{} analyses completed in {:.1f}s'.format(len(pending), time.perf_counter() - start))
+
+    print('# Sweep results #')
+    kinds = TraceWriter.CATEGORIES
+    row = '{:<12}{:<8}{:>11}{:>8}' + '{:>9}' * len(kinds) + '{:>9}  {}'
+    print(row.format('commit', 'status', 'functions', 'calls', *kinds, 'time (s)', 'subject'))
+    records = []
+    first_breaking = None
+    previous = None
+    for sha, subject in revisions:
+        key = revision_group[sha]
+        result = results[key]
+        cached = result['revision'] != sha
+        print(row.format(sha[:10], result['status'], result['functions'], result['calls'], *[result['edits'].get(kind, 0) for kind in kinds],
+            'same' if cached else '{:.1f}'.format(result['time']), subject))
+        if result['status'] != 'ok' and first_breaking is None:
+            first_breaking = (sha, subject, result, previous)
+        previous = result
+        records.append(dict(result, revision=sha, subject=subject, output=None))
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+        print('{} results written in {}'.format(len(records), args.output))
+
+    if first_breaking is None:
+        print('The conversion succeeds on every revision')
+        return
+    sha, subject, result, before = first_breaking
+    if before is None:
+        print('The conversion already fails on the first revision of the range, {} {}'.format(sha[:10], subject))
+    else:
+        print('First breaking commit: {} {}'.format(sha, subject))
+    print('  {}'.format(result['error']))
+
+def measure_instructions(command: list[str]) -> int:
+    """
+        Count the user space instructions retired by `command` with `perf stat`.
+        Return None when perf is not available or not allowed to count.
+    """
+    if shutil.which('perf') is None:
+        return None
+    result = subprocess.run(['perf', 'stat', '-x', ',', '-e', 'instructions:u'] + command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        return None
+    for line in result.stderr.decode().splitlines():
+        fields = line.split(',')
+        if len(fields) > 2 and fields[2].startswith('instructions') and fields[0].isdigit():
+            return int(fields[0])
+    return None
+
+def benchmark(args):
+    """
+        Build the headless frame loop of test/benchmark.cpp against an implicit context tree and an explicit context tree,
+        then compare their frame time, instruction count and binary size for each number of contexts.
+        Instructions are counted with `perf stat`, the count of a run without measured frames is subtracted
+        so context creation, font atlas build and warm-up frames are excluded.
+    """
+    trees = [
+        ('implicit', Config(args.implicit_path), []),
+        ('explicit', Config(args.explicit_path), ['-DBENCH_EXPLICIT']),
+    ]
+    context_counts = [int(c) for c in args.contexts.split(',')]
+    if args.build_dir is not None:
+        build_folder = pathlib.Path(args.build_dir).resolve()
+        build_folder.mkdir(parents=True, exist_ok=True)
+    else:
+        build_folder = pathlib.Path(tempfile.mkdtemp(prefix='make_explicit_imgui_benchmark_'))
+
+    print('--------')
+    print('BENCHMARK SETTINGS:')
+    print('  implicit tree = {}'.format(trees[0][1].root_folder))
+    print('  explicit tree = {}'.format(trees[1][1].root_folder))
+    print('  compiler = {}'.format(args.compiler))
+    print('  build folder = {}'.format(build_folder))
+    print('  frames = {}, windows = {}, widgets per window = {}'.format(args.frames, args.windows, args.widgets))
+    print('  contexts = {} ({})'.format(', '.join(str(c) for c in context_counts), 'parallel threads' if args.parallel else 'one thread'))
+    print('--------')
+
+    results : dict[tuple[str, int], dict] = dict()
+    try:
+        for name, config, defines in trees:
+            sources = [config.imgui_cpp, config.imgui_draw, config.imgui_tables, config.imgui_widgets, config.imgui_implicit]
+            binary = build_folder / ('benchmark_{}{}'.format(name, '.exe' if os.name == 'nt' else ''))
+            command = [args.compiler, '-O2', '-DNDEBUG', '-std=c++17', '-I', str(config.root_folder)] + defines \
+                + [str(config.benchmark_cpp)] + [str(source) for source in sources if source.exists()] + ['-o', str(binary), '-pthread']
+            print('build {} benchmark...'.format(name))
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                print(result.stdout.decode())
+                print(result.stderr.decode())
+                print('build of the {} benchmark has failed'.format(name))
+                exit(-1)
+            binary_size = binary.stat().st_size
+
+            parallel = args.parallel
+            if parallel and re.search(r'thread_local\s+ImGuiContext\s*\*\s*GImGui', config.imgui_internal_h.read_text()) is None:
+                print('WARNING: GImGui is not thread_local in the {} tree (see `convert --thread-safe`), its contexts run on one thread'.format(name))
+                parallel = False
+
+            for context_count in context_counts:
+                print('run {} benchmark with {} contexts...'.format(name, context_count))
+                run_args = [str(args.windows), str(args.widgets), str(context_count), '1' if parallel else '0']
+                result = subprocess.run([str(binary), str(args.frames)] + run_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                if result.returncode != 0:
+                    print(result.stderr.decode())
+                    print('the {} benchmark has failed with {} contexts'.format(name, context_count))
+                    exit(-1)
+                timing = json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+                instructions = measure_instructions([str(binary), str(args.frames)] + run_args)
+                setup_instructions = measure_instructions([str(binary), '0'] + run_args) if instructions is not None else None
+                if instructions is not None and setup_instructions is not None and args.frames > 0:
+                    instructions_per_frame = (instructions - setup_instructions) / (args.frames * context_count)
+                else:
+                    instructions_per_frame = None
+
+                results[(name, context_count)] = {
+                    'median_us': timing['median_us'],
+                    'mean_us': timing['mean_us'],
+                    'throughput': args.frames * context_count / timing['wall_s'] if timing['wall_s'] > 0 else 0.0,
+                    'instructions': instructions_per_frame,
+                    'binary_size': binary_size,
+                }
+    finally:
+        # The binaries of a temporary build folder are only needed by this run
+        if args.build_dir is None:
+            shutil.rmtree(build_folder, ignore_errors=True)
+
+    print('# Benchmark results (per context and per frame) #')
+    row = '{:<10}{:>10}{:>14}{:>14}{:>16}{:>20}{:>14}'
+    print(row.format('tree', 'contexts', 'median (us)', 'mean (us)', 'frames/s', 'instructions', 'binary size'))
+    for context_count in context_counts:
+        for name, _, _ in trees:
+            r = results[(name, context_count)]
+            print(row.format(name, context_count, '{:.1f}'.format(r['median_us']), '{:.1f}'.format(r['mean_us']), '{:.0f}'.format(r['throughput']),
+                '{:.0f}'.format(r['instructions']) if r['instructions'] is not None else 'n/a', r['binary_size']))
+
+    def relative(explicit, implicit):
+        if explicit is None or implicit is None or implicit == 0:
+            return 'n/a'
+        return '{:+.1f}%'.format(100.0 * (explicit - implicit) / implicit)
+
+    for context_count in context_counts:
+        implicit = results[('implicit', context_count)]
+        explicit = results[('explicit', context_count)]
+        print('explicit vs implicit with {} contexts: median frame time {}, instructions {}, frames/s {}, binary size {}'.format(
+            context_count,
+            relative(explicit['median_us'], implicit['median_us']),
+            relative(explicit['instructions'], implicit['instructions']),
+            relative(explicit['throughput'], implicit['throughput']),
+            relative(explicit['binary_size'], implicit['binary_size'])))
 
 def dump_test_ast(args, config):
     index = clang.cindex.Index.create()
@@ -937,9 +3083,220 @@ def dump_test_ast(args, config):
             file.write(x + '\n')
         rprint_cursor(tu.cursor, write_func=write_func)
 
-def main():
-    SourceLine.test()
+def hash_tree(folder: pathlib.Path) -> dict[str, str]:
+    """
+        Return the SHA-256 of every file under `folder`, keyed by path relative to `folder`, ignoring the .git folder
+    """
+    hashes = dict()
+    for path in sorted(folder.rglob('*')):
+        relative = path.relative_to(folder)
+        if path.is_file() and relative.parts[0] != '.git':
+            hashes[relative.as_posix()] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return hashes
+
+def check_implicit_api(root_folder: pathlib.Path, compiler: str) -> list[str]:
+    """
+        Compile test/implicit_api.cpp against a tree converted with `--implicit-api`, and return the errors it raises,
+        or None when `compiler` is not found. Only the errors located in the test file are returned, the converted
+        headers may still need the manual fixes which are out of the scope of the conversion.
+    """
+    if shutil.which(compiler) is None:
+        return None
+    source = pathlib.Path(__file__).resolve().parent / 'test' / 'implicit_api.cpp'
+    command = [compiler, '-std=c++11', '-fsyntax-only', '-I', str(root_folder), str(source)]
+    # CPATH may point at the builtin headers of libclang, see find_missing_clang_headers(), which another compiler cannot use
+    env = { name: value for name, value in os.environ.items() if name != 'CPATH' }
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+    output = result.stdout.decode(errors='replace')
+    return [line for line in output.splitlines() if line.startswith(str(source)) and ': error:' in line]
+
+def measure_host_baseline() -> float:
+    """
+        Return the wall time of a fixed workload, parsing generated C++ code with libclang and visiting its calls,
+        the best of 3 runs. `regress` records the time budgets as multiples of it, so they hold on a faster or slower host.
+    """
+    load_clang()
+    lines = []
+    for i in range(HOST_BASELINE_FUNCTIONS):
+        lines.append('struct S{0} {{ int x; int Get() const {{ return x; }} }};'.format(i))
+        lines.append('int F{0}(S{0}* s, int a) {{ return s->Get() + a{1}; }}'.format(i, ' + F{}(nullptr, a)'.format(i - 1) if i > 0 else ''))
+    content = '\n'.join(lines)
+
+    def call_visitor(cursor_stack):
+        cursor_stack[-1].referenced.get_usr()
+        return True
+
+    durations = []
+    for _ in range(3):
+        start = time.perf_counter()
+        index = clang.cindex.Index.create()
+        tu = index.parse('baseline.cpp', unsaved_files=[('baseline.cpp', content)], args=['-std=c++17'])
+        visit_cursor(tu.cursor, [CursorKind.CALL_EXPR], call_visitor)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+def regress(args):
+    """
+        Convert each snapshot of test/snapshots with the options of each REGRESSION_CASES entry, in a temporary folder,
+        and compare the result with test/golden.json: the hash of every file, and the wall time and memory growth
+        of each phase (see PhaseTimer) against their budgets. With `--update`, the results are recorded instead, and the budgets are
+        the measures increased by `--margin`, plus REGRESSION_TIME_SLACK seconds and REGRESSION_MEMORY_SLACK megabytes
+        so short phases are not flaky.
+        Time budgets are recorded relative to measure_host_baseline(), measured by each run, so the golden results
+        hold on another host. Memory growth does not depend on the speed of the host, its budgets are in megabytes.
+        The cases converted with `--implicit-api` also compile test/implicit_api.cpp, see check_implicit_api().
+    """
+    import tarfile
+    this_script = pathlib.Path(__file__).resolve()
+    snapshot_folder = this_script.parent / 'test' / 'snapshots'
+    golden_path = this_script.parent / 'test' / 'golden.json'
+
+    if args.add_snapshot is not None:
+        config = Config(args.add_snapshot)
+        imgui_h = config.imgui_h.read_text()
+        version = re.search(r'#define\s+IMGUI_VERSION\s+"([^"]+)"', imgui_h).group(1).replace(' ', '-')
+        name = 'imgui-{}{}'.format(version, '-docking' if '#define IMGUI_HAS_DOCK' in imgui_h else '')
+        snapshot_folder.mkdir(parents=True, exist_ok=True)
+        with tarfile.open(snapshot_folder / '{}.tar.xz'.format(name), 'w:xz') as archive:
+            # Only the root files are needed by the conversion
+            for path in sorted(config.root_folder.iterdir()):
+                if path.is_file() and not path.name.startswith('.'):
+                    archive.add(path, arcname=path.name)
+        print('Snapshot {} added, run `regress --update --case {}` to record its golden results'.format(name, name))
+        return
+
+    golden = dict()
+    if golden_path.exists():
+        with open(golden_path) as file:
+            golden = json.load(file)
+
+    cases = []
+    for snapshot in sorted(snapshot_folder.glob('*.tar.xz')):
+        snapshot_name = snapshot.name[:-len('.tar.xz')]
+        for option_name, options in REGRESSION_CASES.items():
+            name = '{}/{}'.format(snapshot_name, option_name)
+            if args.case is None or any(c in [name, snapshot_name, option_name] for c in args.case.split(',')):
+                cases.append((name, snapshot, options))
+    if len(cases) == 0:
+        print('No regression case found in {}'.format(snapshot_folder))
+        exit(-1)
+
+    missing_headers = find_missing_clang_headers()
+    if missing_headers is not None:
+        print('libclang cannot use its builtin headers ({}), set CPATH to the builtin headers of clang of the same version as libclang'.format(missing_headers))
+        exit(-1)
+    baseline = measure_host_baseline()
+
+    print('--------')
+    print('REGRESSION SETTINGS:')
+    print('  snapshots = {}'.format(snapshot_folder))
+    print('  golden results = {}'.format(golden_path))
+    print('  cases = {}'.format(', '.join(name for name, _, _ in cases)))
+    print('  mode = {}'.format('update (margin {:.0f}%)'.format(100.0 * args.margin) if args.update else 'check'))
+    print('  host baseline = {:.3f}s'.format(baseline))
+    print('--------')
+
+    failures = []
+    for name, snapshot, options in cases:
+        print('{} ...'.format(name))
+        snapshot_hash = hashlib.sha256(snapshot.read_bytes()).hexdigest()
+        with tempfile.TemporaryDirectory(prefix='make_explicit_imgui_regress_') as folder:
+            tree = pathlib.Path(folder) / 'imgui'
+            with tarfile.open(snapshot) as archive:
+                if hasattr(tarfile, 'data_filter'):
+                    archive.extractall(tree, filter='data')
+                else:
+                    archive.extractall(tree)
+            inputs = hash_tree(tree)
+            timings_path = pathlib.Path(folder) / 'timings.json'
+            command = [sys.executable, str(this_script), 'convert', str(tree), '--apply', '--no-cache', '--timings', str(timings_path)] + options
+            # The snapshot is not a git repository, it must not be mistaken for the one containing the temporary folder
+            env = dict(os.environ, GIT_CEILING_DIRECTORIES=folder)
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+            output = result.stdout.decode(errors='replace')
+            if args.verbose:
+                print(output, end='')
+            if result.returncode != 0:
+                print(output if not args.verbose else '', end='')
+                failures.append('{}: `convert` has failed'.format(name))
+                continue
+            outputs = { path: h for path, h in hash_tree(tree).items() if inputs.get(path) != h }
+            with open(timings_path) as file:
+                phases = json.load(file)['phases']
+            compile_errors = check_implicit_api(tree, args.compiler) if '--implicit-api' in options else []
+
+        if compile_errors is None:
+            print('  {} not found, the implicit API is not compiled'.format(args.compiler))
+        elif len(compile_errors) > 0:
+            print('\n'.join('  ' + line for line in compile_errors))
+            failures.append('{}: test/implicit_api.cpp does not compile'.format(name))
+
+        if args.update:
+            golden[name] = {
+                'snapshot': snapshot_hash,
+                'outputs': outputs,
+                'budgets': {
+                    phase['name']: {
+                        'relative_time': round((phase['time'] * (1.0 + args.margin) + REGRESSION_TIME_SLACK) / baseline, 2),
+                        'memory_growth': round(phase['memory_growth'] * (1.0 + args.margin) + REGRESSION_MEMORY_SLACK, 1) if phase['memory_growth'] is not None else None,
+                    }
+                    for phase in phases
+                },
+            }
+            for phase in phases:
+                print('  {:<16}{:>8.2f}s {:>8.2f}x {:>10}'.format(phase['name'], phase['time'], phase['time'] / baseline,
+                    '+{:.1f}MB'.format(phase['memory_growth']) if phase['memory_growth'] is not None else 'n/a'))
+            print('  {} files changed, results recorded'.format(len(outputs)))
+            continue
+
+        expected = golden.get(name)
+        if expected is None:
+            failures.append('{}: no golden result, run `regress --update --case {}`'.format(name, name))
+            continue
+        case_failures = []
+        if expected['snapshot'] != snapshot_hash:
+            case_failures.append('the snapshot has changed since the golden results were recorded')
+        for path in sorted(set(outputs.keys()) | set(expected['outputs'].keys())):
+            if outputs.get(path) != expected['outputs'].get(path):
+                case_failures.append('{} differs from the golden result'.format(path) if path in outputs or path in inputs else '{} is missing'.format(path))
+        for phase in phases:
+            budget = expected['budgets'].get(phase['name'])
+            if budget is None:
+                case_failures.append('phase `{}` has no budget'.format(phase['name']))
+                continue
+            over = []
+            relative_time = phase['time'] / baseline
+            if relative_time > budget['relative_time']:
+                over.append('time')
+            if phase['memory_growth'] is not None and budget['memory_growth'] is not None and phase['memory_growth'] > budget['memory_growth']:
+                over.append('memory growth')
+            print('  {:<16}{:>8.2f}s {:>8.2f}x /{:>7.2f}x {:>10} /{:>9}{}'.format(phase['name'], phase['time'], relative_time, budget['relative_time'],
+                '+{:.1f}MB'.format(phase['memory_growth']) if phase['memory_growth'] is not None else 'n/a',
+                '+{:.1f}MB'.format(budget['memory_growth']) if budget['memory_growth'] is not None else 'n/a',
+                '  OVER BUDGET' if len(over) > 0 else ''))
+            if len(over) > 0:
+                case_failures.append('phase `{}` is over its {} budget'.format(phase['name'], ' and '.join(over)))
+        if len(case_failures) == 0:
+            print('  {} files changed, identical to the golden results'.format(len(outputs)))
+        failures += ['{}: {}'.format(name, failure) for failure in case_failures]
+
+    if args.update:
+        with open(golden_path, 'w') as file:
+            json.dump(dict(sorted(golden.items())), file, indent=1)
+            file.write('\n')
+        print('Golden results written in {}'.format(golden_path))
+        if len(failures) == 0:
+            return
 
+    print('--------')
+    if len(failures) > 0:
+        for failure in failures:
+            print(failure)
+        print('{} regressions found'.format(len(failures)))
+        exit(-1)
+    print('No regression found')
+
+def main():
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(dest='command')
 
@@ -949,6 +3306,17 @@ def main():
     convert_parser.add_argument('-x', '--apply', action='store_true', default=False, help="Do apply the conversion. Otherwise it just parses without applying the modification")
     convert_parser.add_argument('-c', '--commit', action='store_true', default=False, help="Commit the result of the conversion")
     convert_parser.add_argument('-d', '--dump-test-ast', action='store_true', default=False, help="Dump AST of manually written code for experimentation purpose")
+    convert_parser.add_argument('-i', '--implicit-api', action='store_true', default=False, help="Generate the backward compatible implicit context API in {} and {}".format('imguiex.h', 'imgui_implicit.cpp'))
+    convert_parser.add_argument('-t', '--thread-safe', action='store_true', default=False, help="Declare GImGui thread_local so contexts can be used on parallel threads, and report the global variables written from functions receiving a context")
+    convert_parser.add_argument('-m', '--matrix', action='store', default=None, metavar='CONFIGURATIONS', help="Also analyze the code compiled with other preprocessor configurations and merge the results. `all` or a comma separated list among: {}".format(', '.join(DEFINE_MATRIX.keys())))
+    convert_parser.add_argument('-j', '--jobs', action='store', type=int, default=None, help="Number of worker processes used by --matrix, the number of CPUs by default")
+    convert_parser.add_argument('--no-cache', action='store_true', default=False, help="Do not read nor write the output cache, always parse and convert the sources")
+    convert_parser.add_argument('--cache-dir', action='store', type=str, default=None, help="Folder of the output cache, {} by default".format(OutputCache.default_folder()))
+    convert_parser.add_argument('--cache-size', action='store', type=int, default=512, help="Maximum size of the output cache in MB, the least recently used conversions are evicted")
+    convert_parser.add_argument('--profile-ffi', action='store_true', default=False, help="Count and time the libclang calls per call site and report the heaviest ones")
+    convert_parser.add_argument('--timings', action='store', type=str, default=None, help="Write the wall time and the memory growth of each phase of the conversion in the given JSON file")
+    convert_parser.add_argument('--trace', action='store', type=str, default=None, help="Write one JSON record per edit in the given JSONL file")
+    convert_parser.add_argument('--trace-categories', action='store', type=TraceWriter.parse_categories, default=None, help="Comma separated list of traced edit kinds among: {}".format(', '.join(TraceWriter.CATEGORIES)))
 
     rebase_parser = subparsers.add_parser('rebase', help='rebase an existing explicit context API branch')
     rebase_parser.add_argument('repository_path', action='store', type=str, help="path to the root of dear imgui repository")
@@ -956,15 +3324,65 @@ def main():
     rebase_parser.add_argument('--base', action='store', required=False)
     rebase_parser.add_argument('--onto', action='store', required=False)
 
+    preflight_parser = subparsers.add_parser('preflight', help='list the commits likely to conflict when running `rebase` with the same arguments')
+    preflight_parser.add_argument('repository_path', action='store', type=str, help="path to the root of dear imgui repository")
+    preflight_parser.add_argument('--branch', action='store', required=True)
+    preflight_parser.add_argument('--base', action='store', required=True)
+    preflight_parser.add_argument('--onto', action='store', required=False)
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='compare the frame time of the implicit and explicit context API with a headless frame loop')
+    benchmark_parser.add_argument('implicit_path', action='store', type=str, help="path to the root of a dear imgui repository with the implicit context API")
+    benchmark_parser.add_argument('explicit_path', action='store', type=str, help="path to the root of a dear imgui repository with the explicit context API")
+    benchmark_parser.add_argument('--frames', action='store', type=int, default=1000, help="number of measured frames per context")
+    benchmark_parser.add_argument('--windows', action='store', type=int, default=20, help="number of windows per frame")
+    benchmark_parser.add_argument('--widgets', action='store', type=int, default=40, help="number of widgets per window")
+    benchmark_parser.add_argument('--contexts', action='store', type=str, default='1,2,4,8', help="comma separated list of context counts to measure")
+    benchmark_parser.add_argument('--parallel', action='store_true', default=False, help="run each context on its own thread, GImGui must be thread_local")
+    benchmark_parser.add_argument('--compiler', action='store', type=str, default=os.environ.get('CXX', 'c++'))
+    benchmark_parser.add_argument('--build-dir', action='store', type=str, default=None, help="folder of the benchmark binaries, kept after the run, a temporary folder removed at the end by default")
+
     rtransform = subparsers.add_parser('rtransform', help='internal command used by `rebase` command')
     rtransform.add_argument('filepath', action='store', type=str, help="path to the root of dear imgui repository")
     
+    api_parser = subparsers.add_parser('api', help='write the explicit context API as JSON and as a header stub, for binding generators')
+    api_parser.add_argument('repository_path', action='store', type=str, help="path to the root of dear imgui repository, with the implicit context API")
+    api_parser.add_argument('--json', action='store', type=str, default=None, help="path of the JSON file to write, the JSON is written on the standard output when neither --json nor --header is given")
+    api_parser.add_argument('--header', action='store', type=str, default=None, help="path of the header stub to write")
+    api_parser.add_argument('--internal', action='store_true', default=False, help="also include the API declared in imgui_internal.h")
+    api_parser.add_argument('-t', '--thread-safe', action='store_true', default=False, help="the API of `convert --thread-safe`")
+    api_parser.add_argument('-m', '--matrix', action='store', default=None, metavar='CONFIGURATIONS', help="the API of `convert --matrix`, with the configurations where each function is compiled")
+    api_parser.add_argument('-j', '--jobs', action='store', type=int, default=None, help="Number of worker processes used by --matrix, the number of CPUs by default")
+    api_parser.add_argument('--no-index', action='store_true', default=False, help="always analyze the sources instead of reading the index of the last `convert`")
+
+    sweep_parser = subparsers.add_parser('sweep', help='analyze every revision of a commit range and report the first one breaking the conversion')
+    sweep_parser.add_argument('repository_path', action='store', type=str, help="path to the root of dear imgui repository")
+    sweep_parser.add_argument('range', action='store', type=str, help="range of commits to analyze, e.g. `v1.89..origin/master`")
+    sweep_parser.add_argument('-v', '--verbose', action='store_true', default=False)
+    sweep_parser.add_argument('-j', '--jobs', action='store', type=int, default=None, help="Number of worker processes, the number of CPUs by default")
+    sweep_parser.add_argument('--no-cache', action='store_true', default=False, help="Analyze every revision again instead of reusing the results of previous sweeps")
+    sweep_parser.add_argument('--output', action='store', type=str, default=None, help="Write one JSON record per revision in the given JSONL file")
+
+    query_parser = subparsers.add_parser('query', help='answer questions about the functions, calls and edits of the last conversion without parsing again')
+    query_parser.add_argument('repository_path', action='store', type=str, help="path to the root of dear imgui repository")
+    query_parser.add_argument('question', action='store', choices=['why', 'callers', 'callees', 'edits'], help="why a function needs a context, its callers, its callees, or the planned edits")
+    query_parser.add_argument('name', action='store', nargs='?', default=None, help="name of the function, optionally qualified, e.g. `ImGuiWindow::GetID`")
+    query_parser.add_argument('--file', action='store', type=str, default=None, help="only report the call sites and edits in this file")
+
+    regress_parser = subparsers.add_parser('regress', help='convert the snapshots of test/snapshots and compare the output and the performance with the golden results')
+    regress_parser.add_argument('-v', '--verbose', action='store_true', default=False)
+    regress_parser.add_argument('--case', action='store', type=str, default=None, help="comma separated list of cases to run, by case, snapshot or option name, e.g. `imgui-1.82` or `thread-safe`")
+    regress_parser.add_argument('--update', action='store_true', default=False, help="record the output and the budgets of the cases in test/golden.json instead of checking them")
+    regress_parser.add_argument('--margin', action='store', type=float, default=0.5, help="fraction added to the measures to make the budgets recorded by --update")
+    regress_parser.add_argument('--compiler', action='store', type=str, default=os.environ.get('CXX', 'c++'), help="compiler used to check the implicit API of the `--implicit-api` cases, skipped when not found")
+    regress_parser.add_argument('--add-snapshot', action='store', type=str, default=None, help="archive the root files of the given dear imgui repository in test/snapshots")
+
     args = parser.parse_args()
 
     if args.command == 'convert':
         config = Config(args.repository_path)
 
         if args.dump_test_ast:
+            load_clang()
             dump_test_ast(args, config)
         else:
             generate(args, config)
@@ -992,6 +3410,29 @@ def main():
 
             exit(-1)
 
+    elif args.command == 'preflight':
+        config = Config(args.repository_path)
+        preflight(args, config)
+
+    elif args.command == 'api':
+        config = Config(args.repository_path)
+        api(args, config)
+
+    elif args.command == 'sweep':
+        config = Config(args.repository_path)
+        sweep(args, config)
+
+    elif args.command == 'query':
+        config = Config(args.repository_path)
+        query(args, config)
+
+    elif args.command == 'benchmark':
+        benchmark(args)
+
+    elif args.command == 'regress':
+        regress(args)
+
+
     elif args.command == 'rtransform':
         filepath = pathlib.Path(args.filepath)
         this_script = pathlib.Path(__file__).resolve()
@@ -0,0 +1,153 @@
+// Headless frame loop used by the `benchmark` command of make_explicit_imgui.py
+// It is compiled once against the implicit context API and once against the explicit one (BENCH_EXPLICIT),
+// with no renderer backend: the frames are built and rendered to ImDrawData only.
+//
+// usage: benchmark <frames> <windows> <widgets per window> <contexts> <parallel>
+// Print one JSON object with the wall time of the measured frames and the per context frame times in microseconds.
+
+#include "imgui.h"
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <thread>
+#include <vector>
+
+#ifdef BENCH_EXPLICIT
+#define CTX         ctx,
+#define CTX_ONLY    ctx
+#else
+#define CTX
+#define CTX_ONLY
+#endif
+
+static const int WARMUP_FRAMES = 10;
+
+struct BenchState
+{
+    ImGuiContext*       Context = NULL;
+    bool                Checked[64] = {};
+    float               Values[64] = {};
+    std::vector<double> FrameTimes;
+};
+
+static void RunFrame(BenchState& state, int window_count, int widget_count)
+{
+    ImGuiContext* ctx = state.Context;
+#ifndef BENCH_EXPLICIT
+    ImGui::SetCurrentContext(ctx);
+#endif
+    ImGuiIO& io = ImGui::GetIO(CTX_ONLY);
+    io.DisplaySize = ImVec2(1920.0f, 1080.0f);
+    io.DeltaTime = 1.0f / 60.0f;
+
+    ImGui::NewFrame(CTX_ONLY);
+    char name[32];
+    for (int w = 0; w < window_count; w++)
+    {
+        snprintf(name, sizeof(name), "Window %d", w);
+        ImGui::SetNextWindowPos(CTX ImVec2((float)(w % 8) * 240.0f, (float)(w / 8 % 8) * 135.0f), ImGuiCond_Always);
+        ImGui::SetNextWindowSize(CTX ImVec2(240.0f, 135.0f), ImGuiCond_Always);
+        ImGui::Begin(CTX name);
+        for (int i = 0; i < widget_count; i++)
+        {
+            ImGui::PushID(CTX i);
+            switch (i % 4)
+            {
+            case 0: ImGui::Text(CTX "Widget %d", i); break;
+            case 1: ImGui::Button(CTX "Button"); break;
+            case 2: ImGui::Checkbox(CTX "Check", &state.Checked[i % 64]); break;
+            default: ImGui::SliderFloat(CTX "Slider", &state.Values[i % 64], 0.0f, 1.0f); break;
+            }
+            ImGui::PopID(CTX_ONLY);
+        }
+        ImGui::End(CTX_ONLY);
+    }
+    ImGui::Render(CTX_ONLY);
+}
+
+static void RunFrames(BenchState& state, int frame_count, int window_count, int widget_count)
+{
+    for (int f = 0; f < frame_count; f++)
+    {
+        auto start = std::chrono::steady_clock::now();
+        RunFrame(state, window_count, widget_count);
+        auto end = std::chrono::steady_clock::now();
+        state.FrameTimes.push_back(std::chrono::duration<double, std::micro>(end - start).count());
+    }
+}
+
+int main(int argc, char** argv)
+{
+    if (argc != 6)
+    {
+        fprintf(stderr, "usage: %s <frames> <windows> <widgets> <contexts> <parallel>\n", argv[0]);
+        return 1;
+    }
+    const int frame_count = atoi(argv[1]);
+    const int window_count = atoi(argv[2]);
+    const int widget_count = atoi(argv[3]);
+    const int context_count = atoi(argv[4]);
+    const bool parallel = atoi(argv[5]) != 0;
+
+    std::vector<BenchState> states(context_count);
+    for (BenchState& state : states)
+    {
+        state.Context = ImGui::CreateContext();
+#ifndef BENCH_EXPLICIT
+        ImGui::SetCurrentContext(state.Context);
+#endif
+        ImGuiContext* ctx = state.Context;
+        ImGuiIO& io = ImGui::GetIO(CTX_ONLY);
+        io.IniFilename = NULL;
+        unsigned char* pixels = NULL;
+        int width = 0, height = 0;
+        io.Fonts->GetTexDataAsRGBA32(&pixels, &width, &height);
+        state.FrameTimes.reserve(frame_count);
+    }
+
+    // Windows are created during the first frames, they are not measured
+    for (BenchState& state : states)
+        for (int f = 0; f < WARMUP_FRAMES; f++)
+            RunFrame(state, window_count, widget_count);
+
+    auto start = std::chrono::steady_clock::now();
+    if (parallel)
+    {
+        // The implicit API sets the current context of each thread, which requires a thread_local GImGui (convert --thread-safe)
+        std::vector<std::thread> threads;
+        for (BenchState& state : states)
+            threads.emplace_back([&state, frame_count, window_count, widget_count]() {
+                RunFrames(state, frame_count, window_count, widget_count);
+            });
+        for (std::thread& thread : threads)
+            thread.join();
+    }
+    else
+    {
+        for (int f = 0; f < frame_count; f++)
+            for (BenchState& state : states)
+                RunFrames(state, 1, window_count, widget_count);
+    }
+    auto end = std::chrono::steady_clock::now();
+
+    std::vector<double> frame_times;
+    for (BenchState& state : states)
+    {
+        frame_times.insert(frame_times.end(), state.FrameTimes.begin(), state.FrameTimes.end());
+        ImGui::DestroyContext(state.Context);
+    }
+    std::sort(frame_times.begin(), frame_times.end());
+    double total = 0.0;
+    for (double t : frame_times)
+        total += t;
+    const size_t count = frame_times.size();
+
+    printf("{\"wall_s\": %f, \"mean_us\": %f, \"median_us\": %f, \"min_us\": %f, \"max_us\": %f}\n",
+        std::chrono::duration<double>(end - start).count(),
+        count > 0 ? total / count : 0.0,
+        count > 0 ? frame_times[count / 2] : 0.0,
+        count > 0 ? frame_times.front() : 0.0,
+        count > 0 ? frame_times.back() : 0.0);
+    return 0;
+}
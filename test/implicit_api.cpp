@@ -0,0 +1,34 @@
+// Compile check of the implicit context API generated by `convert --implicit-api`, run by the `regress` command
+// of make_explicit_imgui.py with -fsyntax-only on each converted snapshot.
+// A literal 0, NULL or nullptr given as first argument converts to ImGuiContext* as well, those calls must not be
+// ambiguous between the implicit API of imguiex.h and the explicit one.
+
+#include "imgui.h"
+
+void ImplicitApiCalls(ImGuiContext* ctx)
+{
+    bool open = true;
+    ImGuiStyle style;
+
+    ImGui::ShowDemoWindow();
+    ImGui::ShowDemoWindow(&open);
+    ImGui::ShowDemoWindow(NULL);
+    ImGui::ShowDemoWindow(nullptr);
+    ImGui::ShowDemoWindow(0);
+    ImGui::ShowMetricsWindow(NULL);
+    ImGui::StyleColorsDark();
+    ImGui::StyleColorsDark(&style);
+    ImGui::StyleColorsDark(NULL);
+    ImGui::SameLine();
+    ImGui::SameLine(0);
+    ImGui::SameLine(0, 4);
+    ImGui::SameLine(100.0f);
+    ImGui::Indent(0);
+    ImGui::PushID(0);
+    ImGui::PopID();
+
+    // The explicit API is still resolved with a null argument after the context
+    ImGui::ShowDemoWindow(ctx, NULL);
+    ImGui::StyleColorsDark(ctx, NULL);
+    ImGui::SameLine(ctx, 0);
+}
@@ -0,0 +1,93 @@
+"""
+    Tests of make_explicit_imgui.py not requiring a Dear ImGui repository, run them with `python -m pytest test`.
+    The conversion itself is covered by the `regress` command, run by test_regress.py.
+"""
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+SCRIPT = pathlib.Path(__file__).resolve().parent.parent / 'make_explicit_imgui.py'
+sys.path.insert(0, str(SCRIPT.parent))
+
+import make_explicit_imgui
+
+
+def test_source_line_transform():
+    make_explicit_imgui.SourceLine.test()
+
+
+def test_libclang_is_loaded_lazily():
+    code = 'import sys; sys.path.insert(0, {!r}); import {}; print("clang" in sys.modules)'.format(str(SCRIPT.parent), SCRIPT.stem)
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert result.returncode == 0, result.stderr.decode()
+    assert result.stdout.decode().strip() == 'False', 'libclang is imported when the script is loaded'
+
+
+def test_command_modules_are_imported_lazily():
+    # zlib is not checked, shutil already imports it
+    modules = ['sqlite3', 'tarfile', 'ctypes', 'concurrent.futures', 'importlib.metadata']
+    code = 'import sys; sys.path.insert(0, {!r}); import {}; print([m for m in {!r} if m in sys.modules])'.format(str(SCRIPT.parent), SCRIPT.stem, modules)
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert result.returncode == 0, result.stderr.decode()
+    assert result.stdout.decode().strip() == '[]', 'modules imported when the script is loaded: ' + result.stdout.decode().strip()
+
+
+def test_rtransform_startup_time(tmp_path):
+    """
+        `rtransform` is run by git for each rebase, it must not load libclang and complete within STARTUP_BUDGET.
+    """
+    todo = tmp_path / 'git-rebase-todo'
+    durations = []
+    for _ in range(3):
+        todo.write_text('pick 0000001 Prepare conversion\npick 0000002 [generated] Convert\npick 0000003 Fix conversion\n# comment\n')
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, str(SCRIPT), 'rtransform', str(todo)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        durations.append(time.perf_counter() - start)
+        assert result.returncode == 0, result.stderr.decode()
+        assert todo.read_text().splitlines()[1] == 'exec python {} convert . -xc'.format(SCRIPT.as_posix()), '`rtransform` did not rewrite the generated commit'
+
+    assert min(durations) <= make_explicit_imgui.STARTUP_BUDGET, '`rtransform` took {:.3f}s'.format(min(durations))
+
+
+def test_parse_diff_hunks_reads_hunk_lines_as_content():
+    diff = '\n'.join([
+        'diff --git a/imgui.cpp b/imgui.cpp',
+        '--- a/imgui.cpp',
+        '+++ b/imgui.cpp',
+        '@@ -3,2 +3,0 @@',
+        '--- removed line looking like a file header',
+        '-+++ b/other.cpp',
+        '@@ -10 +8,2 @@',
+        '-a',
+        '+b',
+        '+c',
+        'diff --git a/imgui.h b/imgui.h',
+        '--- a/imgui.h',
+        '+++ b/imgui.h',
+        '@@ -1 +1 @@',
+        '-x',
+        '\\ No newline at end of file',
+        '+y',
+    ])
+    assert make_explicit_imgui.parse_diff_hunks(diff) == {
+        'imgui.cpp': [(3, 2, 3, 0), (10, 1, 8, 2)],
+        'imgui.h': [(1, 1, 1, 1)],
+    }
+
+
+def test_output_cache_evicts_stale_temporary_entries(tmp_path):
+    cache = make_explicit_imgui.OutputCache(tmp_path, 1024 * 1024)
+    stale = tmp_path / 'tmp-stale'
+    recent = tmp_path / 'tmp-recent'
+    for entry in [stale, recent]:
+        entry.mkdir()
+        (entry / '0.z').write_bytes(b'partial')
+    old = time.time() - make_explicit_imgui.OutputCache.TEMP_MAX_AGE - 60
+    os.utime(stale, (old, old))
+
+    cache.store('key', tmp_path, { tmp_path / 'imgui.cpp': b'converted' }, {}, '')
+    assert not stale.exists(), 'the temporary entry of an interrupted conversion is not removed'
+    assert recent.exists(), 'the temporary entry of a running conversion is removed'
+    assert cache.load('key')['files'] == { 'imgui.cpp': b'converted' }
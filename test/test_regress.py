@@ -0,0 +1,44 @@
+"""
+    Run each case of the `regress` command as a test, they are skipped when libclang or its builtin headers are not found.
+    A case converts a snapshot of test/snapshots, so the whole module takes several minutes.
+"""
+import functools
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+SCRIPT = pathlib.Path(__file__).resolve().parent.parent / 'make_explicit_imgui.py'
+sys.path.insert(0, str(SCRIPT.parent))
+
+import make_explicit_imgui
+
+
+@functools.lru_cache()
+def find_clang_problem() -> str:
+    try:
+        make_explicit_imgui.load_clang()
+    except ImportError as e:
+        return 'libclang is not installed ({})'.format(e)
+    try:
+        missing_headers = make_explicit_imgui.find_missing_clang_headers()
+    except Exception as e:
+        return 'libclang cannot be loaded ({})'.format(e)
+    if missing_headers is not None:
+        return 'libclang cannot use its builtin headers ({}), set CPATH to the builtin headers of clang of the same version as libclang'.format(missing_headers)
+    return None
+
+
+def regression_cases() -> list[str]:
+    snapshots = sorted((SCRIPT.parent / 'test' / 'snapshots').glob('*.tar.xz'))
+    return ['{}/{}'.format(snapshot.name[:-len('.tar.xz')], option_name) for snapshot in snapshots for option_name in make_explicit_imgui.REGRESSION_CASES]
+
+
+@pytest.mark.parametrize('case', regression_cases())
+def test_regression_case(case):
+    problem = find_clang_problem()
+    if problem is not None:
+        pytest.skip(problem)
+    result = subprocess.run([sys.executable, str(SCRIPT), 'regress', '--case', case], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    assert result.returncode == 0, result.stdout.decode(errors='replace')